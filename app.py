@@ -13,10 +13,12 @@ from flask import Flask, render_template, jsonify, request, redirect, url_for
 from flask_login import LoginManager, login_required, current_user
 import uuid
 import json
+from collections import OrderedDict
 import os
 import re
 import secrets
 import string
+import time
 from scheduler import (
     AdvancedScheduleSolver,
     get_all_businesses,
@@ -96,7 +98,7 @@ def create_or_get_employee_user(db_employee, employee_email, employee_name):
     # Ensure username is unique
     username = base_username
     counter = 1
-    while User.query.filter_by(username=username).first():
+    while db.session.query(User.id).filter_by(username=username).first():
         username = f"{base_username}{counter}"
         counter += 1
     
@@ -305,10 +307,10 @@ def get_business_by_slug(slug, force_reload: bool = False):
     # If still not found and force_reload requested, query DB directly by slug
     if force_reload:
         try:
-            from db_service import get_all_persisted_businesses, load_business_from_db
-            db_businesses = get_all_persisted_businesses()
-            for db_business in db_businesses:
-                if slugify(db_business.name) == slug or db_business.business_id == slug:
+            from db_service import get_all_persisted_businesses, get_db_business_full, load_business_from_db
+            for row in get_all_persisted_businesses():
+                if slugify(row.name) == slug or row.business_id == slug:
+                    db_business = get_db_business_full(row.business_id)
                     scenario = load_business_from_db(db_business)
                     # Update cache for future requests
                     try:
@@ -2183,24 +2185,28 @@ def create_swap_request(business_slug, employee_id):
                         email_service = get_email_service()
                         if not email_service.is_configured():
                             return
+                        notifications = []
                         for task in data['tasks']:
-                            try:
-                                db_emp = DBEmployee.query.filter_by(employee_id=task['employee_id']).first()
-                                if not db_emp:
-                                    continue
-                                portal_url = f"{data['base_url']}/employee/{data['business_slug']}/{db_emp.id}/schedule"
-                                email_service.send_swap_request_notification(
-                                    to_email=task['employee_email'],
-                                    recipient_name=task['employee_name'],
-                                    requester_name=data['requester_name'],
-                                    business_name=data['business_name'],
-                                    shift_details=data['shift_details'],
-                                    eligibility_type=task['eligibility_type'],
-                                    portal_url=portal_url
-                                )
-                                print(f"[SWAP] Create notification sent to {task['employee_email']}")
-                            except Exception as e:
-                                print(f"[SWAP] Warning: Could not send notification to {task['employee_name']}: {e}")
+                            db_emp = DBEmployee.query.filter_by(employee_id=task['employee_id']).first()
+                            if not db_emp:
+                                continue
+                            portal_url = f"{data['base_url']}/employee/{data['business_slug']}/{db_emp.id}/schedule"
+                            notifications.append({
+                                'to_email': task['employee_email'],
+                                'recipient_name': task['employee_name'],
+                                'requester_name': data['requester_name'],
+                                'business_name': data['business_name'],
+                                'shift_details': data['shift_details'],
+                                'eligibility_type': task['eligibility_type'],
+                                'portal_url': portal_url,
+                            })
+                        # Sent concurrently rather than one recipient after another
+                        results = email_service.send_swap_request_notifications_bulk(notifications)
+                        for notification, (success, msg) in zip(notifications, results):
+                            if success:
+                                print(f"[SWAP] Create notification sent to {notification['to_email']}")
+                            else:
+                                print(f"[SWAP] Warning: Could not send notification to {notification['recipient_name']}: {msg}")
                 except Exception as e:
                     print(f"[SWAP] Background create email thread error: {e}")
             
@@ -2435,10 +2441,10 @@ def respond_to_swap_request(business_slug, employee_id, request_id):
     schedule_updated = False
     schedule_error = None
     
-    from db_service import get_db_business
+    from db_service import get_db_business, get_week_id
     db_business = get_db_business(business.id)
     if db_business:
-        week_id = swap_request.week_start_date.strftime('%Y-W%V')
+        week_id = get_week_id(swap_request.week_start_date)
         print(f"[SWAP] Looking for schedule: business_db_id={db_business.id}, week_id={week_id}, week_start_date={swap_request.week_start_date}")
         
         # Try by week_id first, then fall back to week_start_date column
@@ -2464,7 +2470,7 @@ def respond_to_swap_request(business_slug, employee_id, request_id):
             # The swap's week_start might differ from the schedule's week_start by up to 1 day (timezone issue)
             for delta in [-1, 1]:
                 alt_date = swap_request.week_start_date + timedelta(days=delta)
-                alt_week_id = alt_date.strftime('%Y-W%V')
+                alt_week_id = get_week_id(alt_date)
                 db_schedule = DBSchedule.query.filter_by(
                     business_db_id=db_business.id,
                     week_id=alt_week_id,
@@ -3299,7 +3305,7 @@ def add_employee():
     # Check if email is already in use by another employee
     employee_email = (data.get('email') or '').strip().lower()
     if employee_email:
-        existing_user = User.query.filter_by(email=employee_email).first()
+        existing_user = db.session.query(User.linked_employee_id).filter_by(email=employee_email).first()
         if existing_user and existing_user.linked_employee_id is not None:
             return jsonify({
                 'success': False,
@@ -3378,7 +3384,8 @@ def add_employee():
                             business_name=business_name,
                             portal_url=portal_url,
                             login_url=login_url,
-                            temp_password=temp_password
+                            temp_password=temp_password,
+                            background=True
                         )
                         print(f"[INVITE] send_portal_invitation result: success={success}, msg={msg}", flush=True)
                         if success:
@@ -3411,7 +3418,7 @@ def add_employee():
     if invitation_sent:
         response_data['invitation_sent'] = True
         response_data['invitation_methods'] = invitation_methods
-        response_data['message'] = f"Employee added and invitation sent via {', '.join(invitation_methods)}"
+        response_data['message'] = f"Employee added and invitation queued via {', '.join(invitation_methods)}"
     elif invitation_errors:
         response_data['invitation_errors'] = invitation_errors
     
@@ -3510,7 +3517,8 @@ def update_employee(emp_id):
                             business_name=business_name,
                             portal_url=portal_url,
                             login_url=login_url,
-                            temp_password=temp_password
+                            temp_password=temp_password,
+                            background=True
                         )
                         print(f"[INVITE-UPDATE] send_portal_invitation result: success={success}, msg={msg}", flush=True)
                         if success:
@@ -3543,7 +3551,7 @@ def update_employee(emp_id):
     if invitation_sent:
         response_data['invitation_sent'] = True
         response_data['invitation_methods'] = invitation_methods
-        response_data['message'] = f"Employee updated and invitation sent via {', '.join(invitation_methods)}"
+        response_data['message'] = f"Employee updated and invitation queued via {', '.join(invitation_methods)}"
     elif invitation_errors:
         response_data['invitation_errors'] = invitation_errors
     
@@ -3703,7 +3711,8 @@ def send_employee_invitation(emp_id):
             business_name=business_name,
             portal_url=portal_url,
             login_url=login_url,
-            temp_password=temp_password
+            temp_password=temp_password,
+            background=True
         )
         
         if success:
@@ -3728,7 +3737,7 @@ def send_employee_invitation(emp_id):
     
     return jsonify({
         'success': True,
-        'message': f"Invitation sent to {employee.name} via {', '.join(invitation_methods)}",
+        'message': f"Invitation queued for {employee.name} via {', '.join(invitation_methods)}",
         'invitation_methods': invitation_methods,
         'portal_url': portal_url
     })
@@ -3741,7 +3750,8 @@ def email_status():
     email_service = get_email_service()
     return jsonify({
         'configured': email_service.is_configured(),
-        'server': email_service.server if email_service.is_configured() else None
+        'server': email_service.server if email_service.is_configured() else None,
+        'stats': email_service.stats()
     })
 
 
@@ -4511,12 +4521,63 @@ def delete_shift_template(shift_id):
 # ==================== BUSINESS SETTINGS API ====================
 
 # List of demo/sample business IDs that use per-user settings
-DEMO_BUSINESS_IDS = ['coffee_shop', 'retail_store', 'restaurant', 'call_center', 'warehouse']
+DEMO_BUSINESS_IDS = frozenset({'coffee_shop', 'retail_store', 'restaurant', 'call_center', 'warehouse'})
 
 
 def is_user_owned_business(business_id):
     """Check if a business is user-created (vs demo)."""
-    return business_id.startswith('user_') or business_id not in DEMO_BUSINESS_IDS
+    # 'user_' IDs are never in the demo set, so a single hashed lookup covers both cases
+    return business_id not in DEMO_BUSINESS_IDS
+
+
+# Per-process LRU cache of parsed settings: (business_id, user_id) -> (updated_at, settings)
+# user_id is None for user-created businesses, whose settings are global.
+# Entries are checked against the row's updated_at on every read, so a save
+# handled by another worker is seen on the next request.
+_settings_cache = OrderedDict()
+SETTINGS_CACHE_SIZE = 256  # entries per worker; one per (business, user) for demo businesses
+
+
+def _load_settings(business_id, user_id):
+    """Load settings for a business (global when user_id is None).
+    
+    With a cached copy, only the row's updated_at is read, and the
+    settings_json text is fetched and parsed again only if it changed.
+    Without one, the row is read once as before.
+    """
+    if user_id is None:
+        model = BusinessSettings
+        query = BusinessSettings.query.filter_by(business_id=business_id)
+    else:
+        model = UserBusinessSettings
+        query = UserBusinessSettings.query.filter_by(
+            user_id=user_id,
+            business_id=business_id
+        )
+    
+    key = (business_id, user_id)
+    cached = _settings_cache.get(key)
+    if cached:
+        stamp = query.with_entities(model.updated_at).first()
+        if stamp is not None and cached[0] == stamp[0]:
+            _settings_cache.move_to_end(key)
+            return cached[1]
+    
+    settings_record = query.first()
+    if settings_record is None:
+        _settings_cache.pop(key, None)
+        return None
+    settings = settings_record.get_settings()
+    _settings_cache[key] = (settings_record.updated_at, settings)
+    _settings_cache.move_to_end(key)
+    if len(_settings_cache) > SETTINGS_CACHE_SIZE:
+        _settings_cache.popitem(last=False)
+    return settings
+
+
+def _invalidate_settings(business_id, user_id):
+    """Drop a cached settings read after it has been written."""
+    _settings_cache.pop((business_id, user_id), None)
 
 
 @app.route('/api/business/<business_id>/settings', methods=['GET'])
@@ -4528,29 +4589,20 @@ def get_business_settings(business_id):
     """
     if is_user_owned_business(business_id):
         # User-created business: get global settings
-        settings_record = BusinessSettings.query.filter_by(business_id=business_id).first()
-        if settings_record:
-            return jsonify({
-                'success': True,
-                'settings': settings_record.get_settings(),
-                'type': 'global'
-            })
+        settings = _load_settings(business_id, None)
         return jsonify({
             'success': True,
-            'settings': {},
+            'settings': settings if settings is not None else {},
             'type': 'global'
         })
     else:
         # Demo business: get user-specific settings
         if current_user.is_authenticated:
-            settings_record = UserBusinessSettings.query.filter_by(
-                user_id=current_user.id,
-                business_id=business_id
-            ).first()
-            if settings_record:
+            settings = _load_settings(business_id, current_user.id)
+            if settings is not None:
                 return jsonify({
                     'success': True,
-                    'settings': settings_record.get_settings(),
+                    'settings': settings,
                     'type': 'user'
                 })
         # Not logged in or no settings: return empty (use defaults)
@@ -4569,8 +4621,9 @@ def save_business_settings(business_id):
     - For user-created businesses: only owner can save (applies globally)
     - For demo businesses: any logged-in user can save (applies only to them)
     """
-    data = request.json or {}
+    data = request.get_json(silent=True) or {}
     settings = data.get('settings', {})
+    user_id = current_user.id
     
     if is_user_owned_business(business_id):
         # User-created business: only owner can save
@@ -4578,22 +4631,26 @@ def save_business_settings(business_id):
         
         if settings_record:
             # Check ownership
-            if settings_record.owner_id != current_user.id:
+            if settings_record.owner_id != user_id:
                 return jsonify({
                     'success': False,
                     'error': 'You do not own this business'
                 }), 403
-            settings_record.set_settings(settings)
+            changed = settings_record.set_settings(settings)
         else:
             # Create new settings record
             settings_record = BusinessSettings(
                 business_id=business_id,
-                owner_id=current_user.id
+                owner_id=user_id
             )
             settings_record.set_settings(settings)
             db.session.add(settings_record)
+            changed = True
         
-        db.session.commit()
+        # Autosave often re-sends identical settings; skip the write then
+        if changed:
+            db.session.commit()
+            _invalidate_settings(business_id, None)
         
         return jsonify({
             'success': True,
@@ -4603,21 +4660,24 @@ def save_business_settings(business_id):
     else:
         # Demo business: save for current user only
         settings_record = UserBusinessSettings.query.filter_by(
-            user_id=current_user.id,
+            user_id=user_id,
             business_id=business_id
         ).first()
         
         if settings_record:
-            settings_record.set_settings(settings)
+            changed = settings_record.set_settings(settings)
         else:
             settings_record = UserBusinessSettings(
-                user_id=current_user.id,
+                user_id=user_id,
                 business_id=business_id
             )
             settings_record.set_settings(settings)
             db.session.add(settings_record)
+            changed = True
         
-        db.session.commit()
+        if changed:
+            db.session.commit()
+            _invalidate_settings(business_id, user_id)
         
         return jsonify({
             'success': True,
@@ -1,15 +1,38 @@
 """Authentication routes for user login, registration, and logout."""
 
 from datetime import datetime, timedelta
+from functools import lru_cache
+import re
 import secrets
 from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
 from flask_login import login_user, logout_user, login_required, current_user
-from models import db, User, PasswordResetToken
+from sqlalchemy import update, func, or_, case
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
+from models import db, User, PasswordResetToken, check_dummy_password
 from scheduler import create_user_business, get_user_business
 from email_service import get_email_service
 
 auth_bp = Blueprint('auth', __name__)
 
+# Registration validation patterns (compiled once at import)
+EMAIL_RE = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+USERNAME_RE = re.compile(r'^[A-Za-z0-9_]+$')
+
+# Slug patterns
+_SLUG_STRIP_RE = re.compile(r'[^\w\s-]')
+_SLUG_SEPARATOR_RE = re.compile(r'[\s_]+')
+_SLUG_DASHES_RE = re.compile(r'-+')
+
+
+@lru_cache(maxsize=1024)
+def _slugify(name):
+    """Convert a company name to its URL slug (same logic as app.py slugify)."""
+    slug = name.lower().strip()
+    slug = _SLUG_STRIP_RE.sub('', slug)
+    slug = _SLUG_SEPARATOR_RE.sub('-', slug)
+    return _SLUG_DASHES_RE.sub('-', slug)
+
 
 @auth_bp.route('/login', methods=['GET', 'POST'])
 def login():
@@ -30,13 +53,16 @@ def login():
             password = request.form.get('password', '')
             remember = request.form.get('remember', False)
         
-        # Find user by email or username
-        # First try email (case-insensitive)
-        user = User.query.filter_by(email=login_id.lower()).first()
+        # Find user by email or username (case-insensitive), in one query.
+        # An email match takes precedence over a username match.
+        login_key = login_id.lower()
+        email_match = func.lower(User.email) == login_key
+        user = User.query.filter(
+            or_(email_match, func.lower(User.username) == login_key)
+        ).order_by(case((email_match, 0), else_=1)).first()
         
-        # If not found by email, try username (case-insensitive)
-        if not user:
-            user = User.query.filter(User.username.ilike(login_id)).first()
+        if user is None:
+            check_dummy_password(password)
         
         if user and user.check_password(password):
             if not user.is_active:
@@ -126,14 +152,14 @@ def register():
         # Validation
         if not email:
             errors.append('Email is required.')
-        elif '@' not in email or '.' not in email:
+        elif not EMAIL_RE.match(email):
             errors.append('Please enter a valid email address.')
         
         if not username:
             errors.append('Username is required.')
         elif len(username) < 3:
             errors.append('Username must be at least 3 characters.')
-        elif not username.isalnum() and '_' not in username:
+        elif not USERNAME_RE.match(username):
             errors.append('Username can only contain letters, numbers, and underscores.')
         
         if not password:
@@ -144,12 +170,13 @@ def register():
         if password != confirm_password:
             errors.append('Passwords do not match.')
         
-        # Check if email already exists
-        if User.query.filter_by(email=email).first():
+        # Check if email or username already exists (one query for both)
+        taken = db.session.query(User.email, User.username).filter(
+            or_(User.email == email, User.username == username)
+        ).all()
+        if any(row.email == email for row in taken):
             errors.append('An account with this email already exists.')
-        
-        # Check if username already exists
-        if User.query.filter_by(username=username).first():
+        if any(row.username == username for row in taken):
             errors.append('This username is already taken.')
         
         if errors:
@@ -165,30 +192,32 @@ def register():
             username=username,
             first_name=first_name or None,
             last_name=last_name or None,
-            company_name=company_name or None
+            company_name=company_name or None,
+            last_login=datetime.utcnow()  # Logged in right below; saves a second commit
         )
         user.set_password(password)
         
         db.session.add(user)
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # A concurrent registration claimed the email/username after our check
+            db.session.rollback()
+            error = 'An account with this email or username already exists.'
+            if request.is_json:
+                return jsonify({'success': False, 'errors': [error]}), 400
+            flash(error, 'error')
+            return render_template('register.html')
         
         # If user provided a company name, create their business
         redirect_url = '/sunrise-coffee/schedule'
         if company_name:
             owner_name = f"{first_name} {last_name}".strip() if first_name or last_name else username
             business = create_user_business(user.id, company_name, owner_name)
-            # Generate the slug for their business (same logic as app.py slugify)
-            import re
-            slug = company_name.lower().strip()
-            slug = re.sub(r'[^\w\s-]', '', slug)
-            slug = re.sub(r'[\s_]+', '-', slug)
-            slug = re.sub(r'-+', '-', slug)
-            redirect_url = f'/{slug}/schedule'
+            redirect_url = f'/{_slugify(company_name)}/schedule'
         
         # Log the user in immediately
         login_user(user)
-        user.last_login = datetime.utcnow()
-        db.session.commit()
         
         if request.is_json:
             return jsonify({
@@ -233,36 +262,38 @@ def get_current_user():
 @login_required
 def update_user():
     """Update the current user's profile."""
-    data = request.get_json()
+    data = request.get_json(silent=True) or {}
+    # Resolve the login proxy once; every field below reads/writes the same row
+    user = current_user._get_current_object()
     
     if 'first_name' in data:
-        current_user.first_name = data['first_name'].strip() or None
+        user.first_name = data['first_name'].strip() or None
     if 'last_name' in data:
-        current_user.last_name = data['last_name'].strip() or None
+        user.last_name = data['last_name'].strip() or None
     if 'company_name' in data:
-        current_user.company_name = data['company_name'].strip() or None
+        user.company_name = data['company_name'].strip() or None
     
     # Handle email change
-    if 'email' in data and data['email'] != current_user.email:
+    if 'email' in data and data['email'] != user.email:
         new_email = data['email'].lower().strip()
-        if User.query.filter_by(email=new_email).first():
+        if db.session.query(User.id).filter_by(email=new_email).first():
             return jsonify({'success': False, 'error': 'Email already in use.'}), 400
-        current_user.email = new_email
+        user.email = new_email
     
     # Handle password change
     if 'new_password' in data and data['new_password']:
         current_password = data.get('current_password', '')
-        if not current_user.check_password(current_password):
+        if not user.check_password(current_password):
             return jsonify({'success': False, 'error': 'Current password is incorrect.'}), 400
         if len(data['new_password']) < 8:
             return jsonify({'success': False, 'error': 'New password must be at least 8 characters.'}), 400
-        current_user.set_password(data['new_password'])
+        user.set_password(data['new_password'])
     
     db.session.commit()
     
     return jsonify({
         'success': True,
-        'user': current_user.to_dict(),
+        'user': user.to_dict(),
         'message': 'Profile updated successfully.'
     })
 
@@ -273,24 +304,23 @@ def update_user():
 @login_required
 def delete_user_account():
     """Delete the current user's account."""
-    data = request.get_json() or {}
+    data = request.get_json(silent=True) or {}
     password = data.get('password', '')
     
     # Require password confirmation for account deletion
     if not current_user.check_password(password):
         return jsonify({'success': False, 'error': 'Incorrect password.'}), 400
     
-    user_id = current_user.id
-    username = current_user.username
+    # Keep the loaded user; it is still in the session after logout
+    user = current_user._get_current_object()
+    username = user.username
     
     # Log out the user first
     logout_user()
     
     # Delete the user from the database
-    user = User.query.get(user_id)
-    if user:
-        db.session.delete(user)
-        db.session.commit()
+    db.session.delete(user)
+    db.session.commit()
     
     return jsonify({
         'success': True,
@@ -387,25 +417,35 @@ def forgot_password():
         
         # Always show success message to prevent email enumeration
         if user:
-            # Delete any existing unused tokens for this user
-            PasswordResetToken.query.filter_by(user_id=user.id, used_at=None).delete()
+            now = datetime.utcnow()
             
-            # Create new token
+            # Invalidate any existing unused tokens for this user
+            db.session.execute(
+                update(PasswordResetToken)
+                .where(PasswordResetToken.user_id == user.id, PasswordResetToken.used_at.is_(None))
+                .values(used_at=now)
+            )
+            
+            # Create new token (committed together with the invalidation above)
             token = secrets.token_urlsafe(32)
             reset_token = PasswordResetToken(
                 user_id=user.id,
-                token=token,
-                expires_at=datetime.utcnow() + timedelta(hours=1)
+                token=PasswordResetToken.hash_token(token),
+                expires_at=now + timedelta(hours=1)
             )
             db.session.add(reset_token)
             db.session.commit()
             
-            # Send email
+            # Queue the email for the background worker - don't block the response on SMTP/Resend.
+            # The queue is drained when the worker shuts down; if it can't take the
+            # email right now (full), send it inline rather than lose it
             email_service = get_email_service()
             if email_service.is_configured():
                 reset_url = request.host_url.rstrip('/') + url_for('auth.reset_password', token=token)
                 user_name = user.first_name or user.username
-                success, msg = email_service.send_password_reset(user.email, user_name, reset_url)
+                success, msg = email_service.send_password_reset(user.email, user_name, reset_url, background=True)
+                if not success:
+                    success, msg = email_service.send_password_reset(user.email, user_name, reset_url)
                 if not success:
                     print(f"[AUTH] Password reset email failed: {msg}", flush=True)
             else:
@@ -423,10 +463,16 @@ def reset_password(token):
     if current_user.is_authenticated:
         return redirect('/sunrise-coffee/schedule')
     
-    # Find and validate token
-    reset_token = PasswordResetToken.query.filter_by(token=token).first()
+    # Find a valid (unused, unexpired) token; user row joined in, we need it on POST
+    reset_token = PasswordResetToken.query.options(
+        joinedload(PasswordResetToken.user)
+    ).filter(
+        PasswordResetToken.token == PasswordResetToken.hash_token(token),
+        PasswordResetToken.used_at.is_(None),
+        PasswordResetToken.expires_at > datetime.utcnow()
+    ).first()
     
-    if not reset_token or not reset_token.is_valid():
+    if not reset_token:
         flash('This password reset link is invalid or has expired.', 'error')
         return redirect(url_for('auth.forgot_password'))
     
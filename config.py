@@ -1,7 +1,9 @@
 """Configuration settings for the Staff Scheduler application."""
 
 import os
+from functools import lru_cache
 from dotenv import load_dotenv
+from sqlalchemy.engine.url import make_url
 
 load_dotenv()
 
@@ -31,15 +33,31 @@ def _get_engine_options(db_url):
     - Railway cold starts
     - Connection timeouts
     - Stale connections after idle periods
+    
+    Pool settings can be tuned per deployment with DB_POOL_SIZE, DB_MAX_OVERFLOW,
+    DB_POOL_RECYCLE, DB_POOL_TIMEOUT and DB_POOL_PRE_PING.
     """
-    if db_url and db_url.startswith('postgresql://'):
+    # Match on the backend name so driver-qualified URLs (postgresql+psycopg2://) count too
+    if db_url and make_url(db_url).get_backend_name() == 'postgresql':
         return {
-            'pool_pre_ping': True,  # Verify connections before use (prevents stale conn errors)
-            'pool_recycle': 300,    # Recycle connections every 5 minutes
-            'pool_size': 5,         # Number of connections to keep open
-            'max_overflow': 10,     # Allow up to 10 additional connections
+            # Verify connections before use (prevents stale conn errors)
+            'pool_pre_ping': os.environ.get('DB_POOL_PRE_PING', '1').lower() not in ('0', 'false', 'no'),
+            'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 300)),   # Recycle connections every 5 minutes
+            'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),          # Number of connections to keep open
+            'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 20)),    # Additional connections under load
+            'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 30)),    # Seconds to wait for a free connection
+            'pool_use_lifo': True,  # Reuse the most recent connection; extras go idle and get recycled
+            'connect_args': {
+                # Abort runaway queries instead of pinning a pooled connection
+                'options': f"-c statement_timeout={int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', 30000))}",
+                # TCP keepalives so dead connections are noticed instead of hanging
+                'keepalives': 1,
+                'keepalives_idle': 30,
+                'keepalives_interval': 10,
+                'keepalives_count': 5,
+            },
         }
-    return {}  # SQLite doesn't need pooling options
+    return {}  # SQLite doesn't need pooling options (its pragmas are set in models.init_db)
 
 
 class Config:
@@ -56,6 +74,9 @@ class Config:
     MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD', '')
     MAIL_FROM_NAME = os.environ.get('MAIL_FROM_NAME', 'Staff Scheduler')
     
+    # Password hashing cost (bcrypt log2 rounds); tune so a check takes ~100ms on the host CPU
+    BCRYPT_LOG_ROUNDS = int(os.environ.get('BCRYPT_LOG_ROUNDS', 12))
+    
     # Database configuration
     SQLALCHEMY_DATABASE_URI = _get_database_url()
     SQLALCHEMY_ENGINE_OPTIONS = _get_engine_options(SQLALCHEMY_DATABASE_URI)
@@ -88,7 +109,12 @@ config = {
 }
 
 
+@lru_cache(maxsize=1)
 def get_config():
-    """Get the appropriate configuration based on environment."""
+    """Get the appropriate configuration based on environment.
+    
+    FLASK_ENV is read once per process; call get_config.cache_clear() after
+    changing it (e.g. in a script or test that switches environments).
+    """
     env = os.environ.get('FLASK_ENV', 'development')
     return config.get(env, config['default'])
@@ -1,23 +1,33 @@
-from app import app
-from models import db, User
 import sys
 
-print("--- DB DIAGNOSTICS ---")
-print(f"Python version: {sys.version}")
 
-with app.app_context():
-    try:
-        count = User.query.count()
-        print(f"User count: {count}")
-        users = User.query.all()
-        for u in users:
-            print(f"User: {u.username} ({u.email})")
-    except Exception as e:
-        print(f"DB Error: {e}")
-        import traceback
-        traceback.print_exc()
+def main():
+    from sqlalchemy import select
+    from app import app
+    from models import db, User
+    
+    print("--- DB DIAGNOSTICS ---")
+    print(f"Python version: {sys.version}")
+    
+    with app.app_context():
+        try:
+            count = User.query.count()
+            print(f"User count: {count}")
+            # Stream rows instead of materializing the whole users table
+            rows = db.session.execute(
+                select(User.username, User.email).execution_options(yield_per=500)
+            )
+            for username, email in rows:
+                print(f"User: {username} ({email})")
+        except Exception as e:
+            print(f"DB Error: {e}")
+            import traceback
+            traceback.print_exc()
+    
+    print("--- CONFIG DIAGNOSTICS ---")
+    for key in ['SQLALCHEMY_DATABASE_URI', 'SECRET_KEY', 'DEBUG', 'ENV', 'FLASK_ENV']:
+        print(f"{key}: {app.config.get(key)}")
 
-print("--- CONFIG DIAGNOSTICS ---")
-for key in ['SQLALCHEMY_DATABASE_URI', 'SECRET_KEY', 'DEBUG', 'ENV', 'FLASK_ENV']:
-    print(f"{key}: {app.config.get(key)}")
 
+if __name__ == '__main__':
+    main()
@@ -9,9 +9,12 @@ from datetime import datetime, date, timedelta
 from typing import Optional, List, Dict
 import json
 
+from flask import g
+from sqlalchemy.orm import selectinload
+
 from models import (
-    db, DBBusiness, DBEmployee, DBRole, DBShiftTemplate, 
-    DBSchedule, DBShiftAssignment, generate_uuid
+    db, User, DBBusiness, DBEmployee, DBRole, DBShiftTemplate, 
+    DBSchedule, DBShiftAssignment, generate_uuid, get_week_id, pack_slots, unpack_slots
 )
 from scheduler.models import (
     BusinessScenario, Employee, Role, TimeSlot, EmployeeClassification,
@@ -19,19 +22,65 @@ from scheduler.models import (
     AvailabilityRange
 )
 
+# Stored enum values -> members, so loads don't go through the enum constructor + try/except per row
+_CLASSIFICATION_MAP = {m.value: m for m in EmployeeClassification}
+_COVERAGE_MODE_MAP = {m.value: m for m in CoverageMode}
+
 
 # =============================================================================
 # BUSINESS OPERATIONS
 # =============================================================================
 
 def get_db_business(business_id: str) -> Optional[DBBusiness]:
-    """Get a database business by its string ID."""
-    return DBBusiness.query.filter_by(business_id=business_id).first()
+    """Get a database business by its string ID (cached for the current app context)."""
+    cache = g.setdefault('_db_business_by_id', {})
+    db_business = cache.get(business_id)
+    if db_business is None or db_business not in db.session:
+        db_business = DBBusiness.query.filter_by(business_id=business_id).first()
+        if db_business is not None:
+            cache[business_id] = db_business
+    return db_business
 
 
 def get_user_db_business(user_id: int) -> Optional[DBBusiness]:
-    """Get the database business owned by a user."""
-    return DBBusiness.query.filter_by(owner_id=user_id).first()
+    """Get the database business owned by a user (cached for the current app context)."""
+    cache = g.setdefault('_db_business_by_owner', {})
+    db_business = cache.get(user_id)
+    if db_business is None or db_business not in db.session:
+        db_business = DBBusiness.query.filter_by(owner_id=user_id).first()
+        if db_business is not None:
+            cache[user_id] = db_business
+    return db_business
+
+
+def _full_business_query():
+    """DBBusiness query that loads roles, employees and shift templates up front."""
+    return DBBusiness.query.options(
+        selectinload(DBBusiness.roles),
+        selectinload(DBBusiness.employees),
+        selectinload(DBBusiness.shift_templates),
+    )
+
+
+def get_db_business_full(business_id: str) -> Optional[DBBusiness]:
+    """Get a database business with its children eager-loaded, for load_business_from_db."""
+    db_business = _full_business_query().filter_by(business_id=business_id).first()
+    if db_business is not None:
+        g.setdefault('_db_business_by_id', {})[business_id] = db_business
+    return db_business
+
+
+def _session_has_changes() -> bool:
+    """True if the session holds new, deleted or actually modified objects."""
+    if db.session.new or db.session.deleted:
+        return True
+    return any(db.session.is_modified(obj) for obj in db.session.dirty)
+
+
+def _forget_db_business():
+    """Drop a business from the per-context lookup caches (after create/delete)."""
+    g.pop('_db_business_by_id', None)
+    g.pop('_db_business_by_owner', None)
 
 
 def save_business_to_db(scenario: BusinessScenario, owner_id: int) -> DBBusiness:
@@ -40,6 +89,7 @@ def save_business_to_db(scenario: BusinessScenario, owner_id: int) -> DBBusiness
     Creates or updates the business and all related data.
     """
     db_business = get_db_business(scenario.id)
+    changed = db_business is None
     
     if db_business is None:
         # Create new business
@@ -54,8 +104,9 @@ def save_business_to_db(scenario: BusinessScenario, owner_id: int) -> DBBusiness
             has_completed_setup=scenario.has_completed_setup
         )
         db_business.set_days_open_list(scenario.days_open)
+        # No flush for the ID: children attach through the `business` relationship
+        # and the FKs are filled in by the single flush at commit
         db.session.add(db_business)
-        db.session.flush()  # Get the ID
     else:
         # Update existing business
         db_business.name = scenario.name
@@ -65,17 +116,25 @@ def save_business_to_db(scenario: BusinessScenario, owner_id: int) -> DBBusiness
         db_business.coverage_mode = scenario.coverage_mode.value
         db_business.has_completed_setup = scenario.has_completed_setup
         db_business.set_days_open_list(scenario.days_open)
+        changed = db.session.is_modified(db_business)
     
-    # Save roles
-    _save_roles_to_db(db_business, scenario.roles)
-    
-    # Save employees
-    _save_employees_to_db(db_business, scenario.employees)
-    
-    # Save shift templates
-    _save_shift_templates_to_db(db_business, scenario.shift_templates)
+    # The child relationship loads below would otherwise autoflush the
+    # half-synced state; everything is flushed once by the commit instead
+    with db.session.no_autoflush:
+        # Save roles
+        changed |= _save_roles_to_db(db_business, scenario.roles)
+        
+        # Save employees
+        changed |= _save_employees_to_db(db_business, scenario.employees)
+        
+        # Save shift templates
+        changed |= _save_shift_templates_to_db(db_business, scenario.shift_templates)
     
-    db.session.commit()
+    # Re-syncing an unchanged scenario (routes sync after every edit) writes no
+    # rows, so skip the commit unless the caller left other changes pending
+    if changed or _session_has_changes():
+        db.session.commit()
+    _forget_db_business()
     return db_business
 
 
@@ -94,10 +153,7 @@ def load_business_from_db(db_business: DBBusiness) -> BusinessScenario:
     shift_templates = [_db_shift_template_to_model(s) for s in db_business.shift_templates]
     
     # Determine coverage mode
-    try:
-        coverage_mode = CoverageMode(db_business.coverage_mode)
-    except ValueError:
-        coverage_mode = CoverageMode.SHIFTS
+    coverage_mode = _COVERAGE_MODE_MAP.get(db_business.coverage_mode, CoverageMode.SHIFTS)
     
     scenario = BusinessScenario(
         id=db_business.business_id,
@@ -125,6 +181,7 @@ def delete_business_from_db(business_id: str) -> bool:
     if db_business:
         db.session.delete(db_business)
         db.session.commit()
+        _forget_db_business()
         return True
     return False
 
@@ -148,35 +205,36 @@ def update_business_metadata(business_id: str, name: str = None, emoji: str = No
 # ROLE OPERATIONS
 # =============================================================================
 
-def _save_roles_to_db(db_business: DBBusiness, roles: List[Role]):
-    """Save roles to the database for a business."""
-    # Get existing role IDs
-    existing_role_ids = {r.role_id for r in db_business.roles}
+def _save_roles_to_db(db_business: DBBusiness, roles: List[Role]) -> bool:
+    """Save roles to the database for a business. Returns False if nothing changed."""
+    # Existing roles keyed by role ID (one load of the relationship, no per-role SELECT)
+    existing_roles = {r.role_id: r for r in db_business.roles}
     new_role_ids = {r.id for r in roles}
     
-    # Delete removed roles
-    for db_role in db_business.roles[:]:
-        if db_role.role_id not in new_role_ids:
-            db.session.delete(db_role)
+    # Delete removed roles in one statement
+    stale_ids = [r.id for r in existing_roles.values() if r.role_id not in new_role_ids]
+    changed = bool(stale_ids)
+    if stale_ids:
+        DBRole.query.filter(DBRole.id.in_(stale_ids)).delete(synchronize_session=False)
     
     # Add or update roles
     for role in roles:
-        db_role = DBRole.query.filter_by(
-            business_db_id=db_business.id, 
-            role_id=role.id
-        ).first()
+        db_role = existing_roles.get(role.id)
         
         if db_role is None:
             db_role = DBRole(
                 role_id=role.id,
-                business_db_id=db_business.id,
+                business=db_business,
                 name=role.name,
                 color=role.color
             )
             db.session.add(db_role)
+            changed = True
         else:
             db_role.name = role.name
             db_role.color = role.color
+            changed |= db.session.is_modified(db_role)
+    return changed
 
 
 def _db_role_to_model(db_role: DBRole) -> Role:
@@ -237,37 +295,63 @@ def delete_role_from_db(business_id: str, role_id: str) -> bool:
 # EMPLOYEE OPERATIONS
 # =============================================================================
 
-def _save_employees_to_db(db_business: DBBusiness, employees: List[Employee]):
-    """Save employees to the database for a business."""
-    existing_emp_ids = {e.employee_id for e in db_business.employees}
+def _save_employees_to_db(db_business: DBBusiness, employees: List[Employee]) -> bool:
+    """Save employees to the database for a business. Returns False if nothing changed."""
+    # Existing employees keyed by employee ID (one load of the relationship, no per-employee SELECT)
+    existing_emps = {e.employee_id: e for e in db_business.employees}
     new_emp_ids = {e.id for e in employees}
     
-    # Delete removed employees
-    for db_emp in db_business.employees[:]:
-        if db_emp.employee_id not in new_emp_ids:
-            db.session.delete(db_emp)
+    # Delete removed employees in one statement, unlinking their user accounts
+    # first (what the ORM's per-row delete did via the user_account backref)
+    stale_ids = [e.id for e in existing_emps.values() if e.employee_id not in new_emp_ids]
+    changed = bool(stale_ids)
+    if stale_ids:
+        User.query.filter(User.linked_employee_id.in_(stale_ids)).update(
+            {'linked_employee_id': None}, synchronize_session=False
+        )
+        DBEmployee.query.filter(DBEmployee.id.in_(stale_ids)).delete(synchronize_session=False)
     
-    # Add or update employees
+    # Add or update employees. Re-applying identical fields leaves a row
+    # unmodified, so the flush issues no UPDATE for it
     for emp in employees:
-        _save_single_employee_to_db(db_business.id, emp)
-
-
-def _save_single_employee_to_db(business_db_id: int, emp: Employee):
-    """Save a single employee to the database."""
+        db_emp = existing_emps.get(emp.id)
+        if db_emp is None:
+            _apply_employee_fields(_new_db_employee(db_business, emp), emp)
+            changed = True
+            continue
+        _apply_employee_fields(db_emp, emp)
+        changed |= db.session.is_modified(db_emp)
+    return changed
+
+
+def _save_single_employee_to_db(db_business: DBBusiness, emp: Employee) -> bool:
+    """Save a single employee to the database. Returns False if nothing changed."""
     db_emp = DBEmployee.query.filter_by(
-        business_db_id=business_db_id,
+        business_db_id=db_business.id,
         employee_id=emp.id
     ).first()
     
     if db_emp is None:
-        db_emp = DBEmployee(
-            employee_id=emp.id,
-            business_db_id=business_db_id,
-            name=emp.name
-        )
-        db.session.add(db_emp)
+        _apply_employee_fields(_new_db_employee(db_business, emp), emp)
+        return True
     
-    # Update all fields
+    _apply_employee_fields(db_emp, emp)
+    return db.session.is_modified(db_emp)
+
+
+def _new_db_employee(db_business: DBBusiness, emp: Employee) -> DBEmployee:
+    """Create and add a DBEmployee row for an employee (fields set by _apply_employee_fields)."""
+    db_emp = DBEmployee(
+        employee_id=emp.id,
+        business=db_business,
+        name=emp.name
+    )
+    db.session.add(db_emp)
+    return db_emp
+
+
+def _apply_employee_fields(db_emp: DBEmployee, emp: Employee):
+    """Copy all fields from an Employee dataclass onto its DBEmployee row."""
     db_emp.name = emp.name
     db_emp.email = emp.email
     db_emp.phone = emp.phone
@@ -288,10 +372,12 @@ def _save_single_employee_to_db(business_db_id: int, emp: Employee):
         'availability_ranges': [r.to_dict() for r in emp.availability_ranges],
         'preference_ranges': [r.to_dict() for r in emp.preference_ranges],
         'time_off_ranges': [r.to_dict() for r in emp.time_off_ranges],
-        # Legacy slot-based format (for backward compatibility)
-        'availability': [{'day': s.day, 'hour': s.hour} for s in emp.availability],
-        'preferences': [{'day': s.day, 'hour': s.hour} for s in emp.preferences],
-        'time_off': [{'day': s.day, 'hour': s.hour} for s in emp.time_off]
+        # Slot-based format, packed as flat [day, hour, ...] lists (version 2;
+        # version 1 blobs stored lists of {'day', 'hour'} dicts)
+        'slots_version': 2,
+        'availability': pack_slots(emp.availability),
+        'preferences': pack_slots(emp.preferences),
+        'time_off': pack_slots(emp.time_off)
     }
     db_emp.set_availability_data(avail_data)
 
@@ -299,10 +385,7 @@ def _save_single_employee_to_db(business_db_id: int, emp: Employee):
 def _db_employee_to_model(db_emp: DBEmployee) -> Employee:
     """Convert a DBEmployee to an Employee dataclass."""
     # Parse classification
-    try:
-        classification = EmployeeClassification(db_emp.classification)
-    except ValueError:
-        classification = EmployeeClassification.PART_TIME
+    classification = _CLASSIFICATION_MAP.get(db_emp.classification, EmployeeClassification.PART_TIME)
     
     # Parse availability
     avail_data = db_emp.get_availability_data()
@@ -321,10 +404,10 @@ def _db_employee_to_model(db_emp: DBEmployee) -> Employee:
         AvailabilityRange.from_dict(r) for r in avail_data.get('time_off_ranges', [])
     ]
     
-    # Load legacy slot-based availability
-    availability = {TimeSlot(s['day'], s['hour']) for s in avail_data.get('availability', [])}
-    preferences = {TimeSlot(s['day'], s['hour']) for s in avail_data.get('preferences', [])}
-    time_off = {TimeSlot(s['day'], s['hour']) for s in avail_data.get('time_off', [])}
+    # Load slot-based availability (packed or legacy dict format)
+    availability = {TimeSlot(d, h) for d, h in unpack_slots(avail_data.get('availability', []))}
+    preferences = {TimeSlot(d, h) for d, h in unpack_slots(avail_data.get('preferences', []))}
+    time_off = {TimeSlot(d, h) for d, h in unpack_slots(avail_data.get('time_off', []))}
     
     # If we have ranges but no slots, generate slots from ranges
     if availability_ranges and not availability:
@@ -372,8 +455,10 @@ def add_employee_to_db(business_id: str, employee: Employee) -> bool:
     if not db_business:
         return False
     
-    _save_single_employee_to_db(db_business.id, employee)
-    db.session.commit()
+    # Idempotent updates (same data re-sent by the API) skip the write entirely
+    changed = _save_single_employee_to_db(db_business, employee)
+    if changed:
+        db.session.commit()
     return True
 
 
@@ -420,27 +505,26 @@ def get_employee_from_db(business_id: str, employee_id: str) -> Optional[Employe
 # SHIFT TEMPLATE OPERATIONS
 # =============================================================================
 
-def _save_shift_templates_to_db(db_business: DBBusiness, templates: List[ShiftTemplate]):
-    """Save shift templates to the database for a business."""
-    existing_ids = {s.shift_id for s in db_business.shift_templates}
+def _save_shift_templates_to_db(db_business: DBBusiness, templates: List[ShiftTemplate]) -> bool:
+    """Save shift templates to the database for a business. Returns False if nothing changed."""
+    # Existing templates keyed by shift ID (one load of the relationship, no per-template SELECT)
+    existing_shifts = {s.shift_id: s for s in db_business.shift_templates}
     new_ids = {s.id for s in templates}
     
-    # Delete removed templates
-    for db_shift in db_business.shift_templates[:]:
-        if db_shift.shift_id not in new_ids:
-            db.session.delete(db_shift)
+    # Delete removed templates in one statement
+    stale_ids = [s.id for s in existing_shifts.values() if s.shift_id not in new_ids]
+    changed = bool(stale_ids)
+    if stale_ids:
+        DBShiftTemplate.query.filter(DBShiftTemplate.id.in_(stale_ids)).delete(synchronize_session=False)
     
     # Add or update templates
     for shift in templates:
-        db_shift = DBShiftTemplate.query.filter_by(
-            business_db_id=db_business.id,
-            shift_id=shift.id
-        ).first()
+        db_shift = existing_shifts.get(shift.id)
         
         if db_shift is None:
             db_shift = DBShiftTemplate(
                 shift_id=shift.id,
-                business_db_id=db_business.id,
+                business=db_business,
                 name=shift.name,
                 start_hour=shift.start_hour,
                 end_hour=shift.end_hour,
@@ -459,6 +543,8 @@ def _save_shift_templates_to_db(db_business: DBBusiness, templates: List[ShiftTe
         roles_data = [{'role_id': r.role_id, 'count': r.count, 'max_count': r.max_count} 
                       for r in shift.roles]
         db_shift.set_roles_requirements(roles_data)
+        changed |= db_shift in db.session.new or db.session.is_modified(db_shift)
+    return changed
 
 
 def _db_shift_template_to_model(db_shift: DBShiftTemplate) -> ShiftTemplate:
@@ -495,7 +581,7 @@ def save_schedule_to_db(business_id: str, schedule: Schedule, week_start: date,
         return None
     
     # Generate week ID
-    week_id = week_start.strftime('%Y-W%V')
+    week_id = get_week_id(week_start)
     
     # Check for existing schedule
     db_schedule = DBSchedule.query.filter_by(
@@ -514,8 +600,12 @@ def save_schedule_to_db(business_id: str, schedule: Schedule, week_start: date,
     else:
         db_schedule.status = status
     
-    # Save schedule data
-    db_schedule.set_schedule_data(schedule.to_dict())
+    # Save schedule data. The coverage matrix is stored as [day, hour, role, employee_id]
+    # rows so loading doesn't have to split and int() "d,h,r" string keys.
+    # slot_assignments keeps its "d,h" keyed form: the shift-swap route edits it in place.
+    schedule_data = schedule.to_dict()
+    schedule_data['coverage_matrix'] = [[d, h, r, emp_id] for (d, h, r), emp_id in schedule.coverage_matrix.items()]
+    db_schedule.set_schedule_data(schedule_data)
     db_schedule.coverage_percentage = schedule.coverage_percentage
     db_schedule.total_hours_needed = schedule.total_hours_needed
     db_schedule.total_hours_filled = schedule.total_hours_filled
@@ -525,23 +615,40 @@ def save_schedule_to_db(business_id: str, schedule: Schedule, week_start: date,
     
     db.session.flush()
     
-    # Save individual assignments for querying
-    # First delete existing assignments
-    DBShiftAssignment.query.filter_by(schedule_id=db_schedule.id).delete()
+    # Save individual assignments for querying.
+    # Diff against the stored rows so an incremental edit only touches what changed.
+    existing = {}
+    for db_assignment in DBShiftAssignment.query.filter_by(schedule_id=db_schedule.id):
+        key = (db_assignment.employee_id, db_assignment.day, db_assignment.start_hour,
+               db_assignment.end_hour, db_assignment.role_id)
+        existing.setdefault(key, []).append(db_assignment)
     
-    # Add new assignments
+    new_rows = []
     for assignment in schedule.assignments:
-        db_assignment = DBShiftAssignment(
-            schedule_id=db_schedule.id,
-            employee_id=assignment.employee_id,
-            employee_name=assignment.employee_name,
-            day=assignment.day,
-            start_hour=assignment.start_hour,
-            end_hour=assignment.end_hour,
-            role_id=assignment.role_id,
-            color=assignment.color
-        )
-        db.session.add(db_assignment)
+        key = (assignment.employee_id, assignment.day, assignment.start_hour,
+               assignment.end_hour, assignment.role_id)
+        matches = existing.get(key)
+        if matches:
+            db_assignment = matches.pop()
+            db_assignment.employee_name = assignment.employee_name
+            db_assignment.color = assignment.color
+        else:
+            new_rows.append({
+                'schedule_id': db_schedule.id,
+                'employee_id': assignment.employee_id,
+                'employee_name': assignment.employee_name,
+                'day': assignment.day,
+                'start_hour': assignment.start_hour,
+                'end_hour': assignment.end_hour,
+                'role_id': assignment.role_id,
+                'color': assignment.color
+            })
+    
+    stale_ids = [a.id for matches in existing.values() for a in matches]
+    if stale_ids:
+        DBShiftAssignment.query.filter(DBShiftAssignment.id.in_(stale_ids)).delete(synchronize_session=False)
+    if new_rows:
+        db.session.bulk_insert_mappings(DBShiftAssignment, new_rows)
     
     db.session.commit()
     return db_schedule
@@ -553,7 +660,7 @@ def get_schedule_from_db(business_id: str, week_start: date) -> Optional[Schedul
     if not db_business:
         return None
     
-    week_id = week_start.strftime('%Y-W%V')
+    week_id = get_week_id(week_start)
     
     db_schedule = DBSchedule.query.filter_by(
         business_db_id=db_business.id,
@@ -576,7 +683,7 @@ def get_schedule_with_status_from_db(business_id: str, week_start: date) -> tupl
     if not db_business:
         return None, None
     
-    week_id = week_start.strftime('%Y-W%V')
+    week_id = get_week_id(week_start)
     
     db_schedule = DBSchedule.query.filter_by(
         business_db_id=db_business.id,
@@ -595,7 +702,7 @@ def get_published_schedule_from_db(business_id: str, week_start: date) -> Option
     if not db_business:
         return None
     
-    week_id = week_start.strftime('%Y-W%V')
+    week_id = get_week_id(week_start)
     
     # Try by week_id first
     db_schedule = DBSchedule.query.filter_by(
@@ -616,7 +723,7 @@ def get_published_schedule_from_db(business_id: str, week_start: date) -> Option
         # Try nearby dates (client/server may be 1 day apart due to timezones)
         for delta in [-1, 1]:
             alt_date = week_start + timedelta(days=delta)
-            alt_week_id = alt_date.strftime('%Y-W%V')
+            alt_week_id = get_week_id(alt_date)
             db_schedule = DBSchedule.query.filter_by(
                 business_db_id=db_business.id,
                 week_id=alt_week_id,
@@ -649,12 +756,17 @@ def _db_schedule_to_model(db_schedule: DBSchedule) -> Schedule:
         assignments.append(assignment)
     
     # Reconstruct coverage matrix
-    coverage_matrix = {}
-    for key, emp_id in data.get('coverage_matrix', {}).items():
-        parts = key.split(',')
-        if len(parts) == 3:
-            d, h, r = int(parts[0]), int(parts[1]), parts[2]
-            coverage_matrix[(d, h, r)] = emp_id
+    raw_coverage = data.get('coverage_matrix', [])
+    if isinstance(raw_coverage, list):
+        coverage_matrix = {(d, h, r): emp_id for d, h, r, emp_id in raw_coverage}
+    else:
+        # Older blobs keyed the matrix by "day,hour,role" strings
+        coverage_matrix = {}
+        for key, emp_id in raw_coverage.items():
+            parts = key.split(',')
+            if len(parts) == 3:
+                d, h, r = int(parts[0]), int(parts[1]), parts[2]
+                coverage_matrix[(d, h, r)] = emp_id
     
     # Reconstruct slot assignments
     slot_assignments = {}
@@ -688,7 +800,7 @@ def publish_schedule_in_db(business_id: str, week_start: date) -> bool:
     if not db_business:
         return False
     
-    week_id = week_start.strftime('%Y-W%V')
+    week_id = get_week_id(week_start)
     
     db_schedule = DBSchedule.query.filter_by(
         business_db_id=db_business.id,
@@ -709,23 +821,31 @@ def get_employee_shifts(business_id: str, employee_id: str, week_start: date) ->
     if not db_business:
         return []
     
-    week_id = week_start.strftime('%Y-W%V')
-    
-    db_schedule = DBSchedule.query.filter_by(
-        business_db_id=db_business.id,
-        week_id=week_id,
-        status='published'
-    ).first()
-    
-    if not db_schedule:
-        return []
-    
-    shifts = DBShiftAssignment.query.filter_by(
-        schedule_id=db_schedule.id,
-        employee_id=employee_id
+    week_id = get_week_id(week_start)
+    
+    # Join straight to the published schedule and select only the assignment
+    # columns, so the schedule's JSON blob is never loaded
+    shifts = db.session.query(
+        DBShiftAssignment.employee_id, DBShiftAssignment.employee_name,
+        DBShiftAssignment.day, DBShiftAssignment.start_hour, DBShiftAssignment.end_hour,
+        DBShiftAssignment.role_id, DBShiftAssignment.color
+    ).join(DBSchedule, DBShiftAssignment.schedule_id == DBSchedule.id).filter(
+        DBSchedule.business_db_id == db_business.id,
+        DBSchedule.week_id == week_id,
+        DBSchedule.status == 'published',
+        DBShiftAssignment.employee_id == employee_id
     ).order_by(DBShiftAssignment.day, DBShiftAssignment.start_hour).all()
     
-    return [s.to_dict() for s in shifts]
+    return [{
+        'employee_id': s.employee_id,
+        'employee_name': s.employee_name,
+        'day': s.day,
+        'start_hour': s.start_hour,
+        'end_hour': s.end_hour,
+        'duration': s.end_hour - s.start_hour,
+        'role_id': s.role_id,
+        'color': s.color
+    } for s in shifts]
 
 
 # =============================================================================
@@ -737,9 +857,17 @@ def is_business_persisted(business_id: str) -> bool:
     return get_db_business(business_id) is not None
 
 
-def get_all_persisted_businesses() -> List[DBBusiness]:
-    """Get all businesses from the database."""
-    return DBBusiness.query.all()
+def get_all_persisted_businesses(full: bool = False) -> List:
+    """Get all businesses from the database.
+    
+    By default returns lightweight (id, business_id, name, owner_id) rows; pass
+    full=True for DBBusiness objects with their children eager-loaded.
+    """
+    if full:
+        return _full_business_query().all()
+    return db.session.query(
+        DBBusiness.id, DBBusiness.business_id, DBBusiness.name, DBBusiness.owner_id
+    ).all()
 
 
 def sync_business_to_db(scenario: BusinessScenario, owner_id: int):
@@ -12,194 +12,109 @@ Configuration via environment variables:
 - MAIL_USERNAME: Your email address
 - MAIL_PASSWORD: App password (NOT your regular password)
 - MAIL_FROM_NAME: Display name for sender (default: Staff Scheduler)
+- MAIL_MAX_MESSAGES_PER_CONN: Messages per SMTP connection before reconnecting (default: 100)
+- RESEND_RPS: Resend requests per second across all threads (default: 2)
+- EMAIL_DEBUG_PRETTY: Set to 1 to send HTML templates unminified (for debugging)
 """
 
 import os
-import smtplib
-import socket
+import base64
+import gzip
+import html
+import http.client
+import queue
+import random
+import re
+import ssl
 import json
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from typing import Optional, Tuple
-from urllib.request import urlopen, Request
-from urllib.error import URLError, HTTPError
+import threading
+import time
+import uuid
+from collections import Counter
+from string import Template
+from concurrent.futures import ThreadPoolExecutor
+from email.header import Header
+from email.utils import formataddr
+from functools import lru_cache
+from typing import TYPE_CHECKING, List, Optional, Tuple
 
+# smtplib is imported where SMTP is used, so Resend-only deployments never load it
+if TYPE_CHECKING:
+    import smtplib
 
-class EmailService:
-    """Email service supporting Resend API and SMTP."""
-    
-    def __init__(self):
-        # Resend API (preferred for cloud platforms)
-        self.resend_api_key = os.environ.get('RESEND_API_KEY', '')
-        self.resend_from_email = os.environ.get('RESEND_FROM_EMAIL', 'onboarding@resend.dev')
-        
-        # SMTP settings (fallback)
-        self.server = os.environ.get('MAIL_SERVER', 'smtp.gmail.com')
-        self.port = int(os.environ.get('MAIL_PORT', 587))
-        self.username = os.environ.get('MAIL_USERNAME', '')
-        self.password = os.environ.get('MAIL_PASSWORD', '')
-        self.from_name = os.environ.get('MAIL_FROM_NAME', 'Staff Scheduler')
-        
-        # Check which method is available
-        self.use_resend = bool(self.resend_api_key)
-        self.use_smtp = bool(self.username and self.password)
-        self.enabled = self.use_resend or self.use_smtp
-    
-    def is_configured(self) -> bool:
-        """Check if email is properly configured."""
-        return self.enabled
-    
-    def _send_via_resend(
-        self,
-        to_email: str,
-        subject: str,
-        html_body: str,
-        text_body: Optional[str] = None
-    ) -> Tuple[bool, str]:
-        """Send email via Resend API."""
-        try:
-            data = {
-                "from": f"{self.from_name} <{self.resend_from_email}>",
-                "to": [to_email],
-                "subject": subject,
-                "html": html_body
-            }
-            if text_body:
-                data["text"] = text_body
-            
-            req = Request(
-                "https://api.resend.com/emails",
-                data=json.dumps(data).encode('utf-8'),
-                headers={
-                    "Authorization": f"Bearer {self.resend_api_key}",
-                    "Content-Type": "application/json"
-                },
-                method="POST"
-            )
-            
-            with urlopen(req, timeout=15) as response:
-                result = json.loads(response.read().decode('utf-8'))
-                return True, f"Email sent via Resend (id: {result.get('id', 'unknown')})"
-                
-        except HTTPError as e:
-            error_body = e.read().decode('utf-8') if e.fp else str(e)
-            return False, f"Resend API error ({e.code}): {error_body}"
-        except URLError as e:
-            return False, f"Resend network error: {str(e.reason)}"
-        except Exception as e:
-            return False, f"Resend error: {str(e)}"
-    
-    def _send_via_smtp(
-        self,
-        to_email: str,
-        subject: str,
-        html_body: str,
-        text_body: Optional[str] = None
-    ) -> Tuple[bool, str]:
-        """Send email via SMTP."""
-        try:
-            # Create message
-            msg = MIMEMultipart('alternative')
-            msg['Subject'] = subject
-            msg['From'] = f"{self.from_name} <{self.username}>"
-            msg['To'] = to_email
-            
-            # Add text and HTML parts
-            if text_body:
-                msg.attach(MIMEText(text_body, 'plain'))
-            msg.attach(MIMEText(html_body, 'html'))
-            
-            # Send email with timeout
-            if self.port == 465:
-                with smtplib.SMTP_SSL(self.server, self.port, timeout=15) as server:
-                    server.login(self.username, self.password)
-                    server.send_message(msg)
-            else:
-                with smtplib.SMTP(self.server, self.port, timeout=15) as server:
-                    server.starttls()
-                    server.login(self.username, self.password)
-                    server.send_message(msg)
-            
-            return True, "Email sent via SMTP"
-            
-        except smtplib.SMTPAuthenticationError:
-            return False, "SMTP authentication failed. Check your MAIL_USERNAME and MAIL_PASSWORD."
-        except smtplib.SMTPException as e:
-            return False, f"SMTP error: {str(e)}"
-        except socket.timeout:
-            return False, "SMTP connection timed out."
-        except socket.error as e:
-            return False, f"SMTP network error: {str(e)}"
-        except Exception as e:
-            return False, f"SMTP error: {str(e)}"
-    
-    def send_email(
-        self,
-        to_email: str,
-        subject: str,
-        html_body: str,
-        text_body: Optional[str] = None
-    ) -> Tuple[bool, str]:
-        """
-        Send an email. Tries Resend API first, then falls back to SMTP.
-        
-        Returns:
-            Tuple of (success: bool, message: str)
-        """
-        if not self.enabled:
-            return False, "Email service not configured. Set RESEND_API_KEY or MAIL_USERNAME/MAIL_PASSWORD."
-        
-        # Try Resend API first (works on cloud platforms like Railway)
-        if self.use_resend:
-            success, msg = self._send_via_resend(to_email, subject, html_body, text_body)
-            if success:
-                return success, msg
-            # Log Resend failure but continue to SMTP fallback
-            print(f"[EMAIL] Resend failed: {msg}", flush=True)
-        
-        # Fall back to SMTP
-        if self.use_smtp:
-            return self._send_via_smtp(to_email, subject, html_body, text_body)
-        
-        return False, "No email method available"
+RESEND_API_HOST = 'api.resend.com'
+
+# Most messages Resend accepts in one /emails/batch request
+RESEND_BATCH_SIZE = 100
+
+# Longest Retry-After (seconds) honoured on a 429 before giving up on the request
+RESEND_MAX_RETRY_AFTER = 30
+
+# Waits (seconds) between attempts when a send fails transiently: 3 attempts in all.
+# Each wait is jittered by +/-50% (see _jittered) so workers don't retry in lockstep.
+SEND_RETRY_DELAYS = (0.5, 2.0)
+
+# Resend statuses worth retrying; other 4xx (400, 401, 403, 422) fail fast
+RESEND_RETRYABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# After this many Resend outage failures in a row (network errors, 429/5xx after
+# retries), send straight over SMTP for RESEND_BREAKER_COOLDOWN seconds
+RESEND_BREAKER_THRESHOLD = 5
+RESEND_BREAKER_COOLDOWN = 30
+
+# A bulk run (SMTP back to back, or send_bulk over Resend) gives up on its
+# remaining messages once at least this many have been tried and a third of them
+# failed on connection errors, temporary replies or Resend outage statuses even
+# after retries; the rest would almost surely fail the same way
+BULK_ABORT_MIN_SENDS = 10
+
+# Seconds to establish a connection vs. to wait on an established one. Connects
+# fail fast on a dead host; reads leave room for a slow batch request.
+RESEND_CONNECT_TIMEOUT = 3
+RESEND_READ_TIMEOUT = 10
+SMTP_CONNECT_TIMEOUT = 5
+SMTP_READ_TIMEOUT = 30
+
+# Gzip Resend request bodies larger than this many bytes
+RESEND_GZIP_MIN_BYTES = 4096
+
+# Reconnect instead of reusing an SMTP connection idle for longer than this
+# (seconds); servers drop idle sessions after a few minutes, often silently
+SMTP_IDLE_TIMEOUT = 60
+
+# Default for MAIL_MAX_MESSAGES_PER_CONN: recycle a reused SMTP connection after
+# this many messages (conservative; many providers throttle long sessions)
+SMTP_MAX_MESSAGES_PER_CONN = 100
+
+# Longest a worker waits at shutdown for queued emails to go out (see flush);
+# well inside gunicorn's graceful_timeout
+EMAIL_FLUSH_TIMEOUT = 25
+
+
+def _minify_html(markup: str) -> str:
+    """
+    Drop indentation, blank lines and comments from an HTML template.
     
-    def send_portal_invitation(
-        self,
-        to_email: str,
-        employee_name: str,
-        business_name: str,
-        portal_url: str,
-        login_url: Optional[str] = None,
-        temp_password: Optional[str] = None
-    ) -> Tuple[bool, str]:
-        """
-        Send a portal invitation email to an employee.
-        
-        Args:
-            to_email: Employee's email address
-            employee_name: Employee's name
-            business_name: Name of the business
-            portal_url: Full URL to the employee portal
-            login_url: URL to the login page (optional)
-            temp_password: Temporary password for first login (optional, if None user already has account)
-            
-        Returns:
-            Tuple of (success: bool, message: str)
-        """
-        subject = f"You're invited to view your schedule at {business_name}"
-        
-        # Build login credentials section if temp_password provided
-        if temp_password and login_url:
-            credentials_html = f"""
+    Line breaks are kept, so whitespace between inline elements still renders
+    as a space. Set EMAIL_DEBUG_PRETTY=1 to keep templates as written.
+    """
+    if os.environ.get('EMAIL_DEBUG_PRETTY'):
+        return markup
+    markup = re.sub(r'<!--.*?-->', '', markup, flags=re.DOTALL)
+    return '\n'.join(line.strip() for line in markup.splitlines() if line.strip())
+
+
+# Portal invitation templates, parsed once at import and filled per message
+_INVITE_CREDENTIALS_HTML = Template(_minify_html("""
                         <div style="background-color: #f0f4ff; border: 1px solid #467df6; border-radius: 10px; padding: 20px; margin: 20px 0;">
                             <h3 style="margin: 0 0 15px; font-size: 16px; color: #1a1a2e;">
                                 🔐 Your Login Credentials
                             </h3>
                             <p style="margin: 0 0 10px; font-size: 14px; color: #5a5a70;">
-                                <strong>Email:</strong> {to_email}
+                                <strong>Email:</strong> $to_email
                             </p>
                             <p style="margin: 0 0 15px; font-size: 14px; color: #5a5a70;">
-                                <strong>Temporary Password:</strong> <code style="background: #e0e0e0; padding: 2px 8px; border-radius: 4px; font-family: monospace;">{temp_password}</code>
+                                <strong>Temporary Password:</strong> <code style="background: #e0e0e0; padding: 2px 8px; border-radius: 4px; font-family: monospace;">$temp_password</code>
                             </p>
                             <p style="margin: 0; font-size: 13px; color: #e74c3c;">
                                 ⚠️ You'll be asked to change your password on first login.
@@ -208,33 +123,33 @@ class EmailService:
                         
                         <!-- Login Button -->
                         <div style="text-align: center; margin: 25px 0;">
-                            <a href="{login_url}" style="display: inline-block; padding: 14px 32px; background: linear-gradient(135deg, #467df6 0%, #a855f7 100%); color: #ffffff; text-decoration: none; border-radius: 10px; font-weight: 600; font-size: 16px;">
+                            <a href="$login_url" style="display: inline-block; padding: 14px 32px; background: linear-gradient(135deg, #467df6 0%, #a855f7 100%); color: #ffffff; text-decoration: none; border-radius: 10px; font-weight: 600; font-size: 16px;">
                                 Log In Now
                             </a>
                         </div>
-"""
-            credentials_text = f"""
+"""))
+
+_INVITE_CREDENTIALS_TEXT = Template("""
 YOUR LOGIN CREDENTIALS
 ----------------------
-Email: {to_email}
-Temporary Password: {temp_password}
+Email: $to_email
+Temporary Password: $temp_password
 
 ⚠️ You'll be asked to change your password on first login.
 
-Log in here: {login_url}
-"""
-        else:
-            credentials_html = """
+Log in here: $login_url
+""")
+
+_INVITE_CTA_HTML = Template(_minify_html("""
                         <!-- CTA Button -->
                         <div style="text-align: center; margin: 30px 0;">
-                            <a href="{portal_url}" style="display: inline-block; padding: 14px 32px; background: linear-gradient(135deg, #467df6 0%, #a855f7 100%); color: #ffffff; text-decoration: none; border-radius: 10px; font-weight: 600; font-size: 16px;">
+                            <a href="$portal_url" style="display: inline-block; padding: 14px 32px; background: linear-gradient(135deg, #467df6 0%, #a855f7 100%); color: #ffffff; text-decoration: none; border-radius: 10px; font-weight: 600; font-size: 16px;">
                                 View My Schedule
                             </a>
                         </div>
-""".format(portal_url=portal_url)
-            credentials_text = ""
-        
-        html_body = f"""
+"""))
+
+_INVITE_HTML = Template(_minify_html("""
 <!DOCTYPE html>
 <html>
 <head>
@@ -256,11 +171,11 @@ Log in here: {login_url}
                         
                         <!-- Main Content -->
                         <h2 style="margin: 0 0 15px; font-size: 20px; color: #1a1a2e;">
-                            Hi {employee_name}!
+                            Hi $employee_name!
                         </h2>
                         
                         <p style="margin: 0 0 20px; font-size: 16px; color: #5a5a70; line-height: 1.6;">
-                            You've been invited to access the employee portal at <strong>{business_name}</strong>.
+                            You've been invited to access the employee portal at <strong>$business_name</strong>.
                         </p>
                         
                         <p style="margin: 0 0 25px; font-size: 16px; color: #5a5a70; line-height: 1.6;">
@@ -275,30 +190,30 @@ Log in here: {login_url}
                             <li>Request shift swaps</li>
                         </ul>
                         
-                        {credentials_html}
+                        $credentials_html
                         
                         <p style="margin: 25px 0 0; font-size: 14px; color: #9090a0; line-height: 1.6;">
                             Or copy and paste this link into your browser:<br>
-                            <a href="{portal_url}" style="color: #467df6; word-break: break-all;">{portal_url}</a>
+                            <a href="$portal_url" style="color: #467df6; word-break: break-all;">$portal_url</a>
                         </p>
                     </div>
                 </div>
                 
                 <!-- Footer -->
                 <p style="text-align: center; margin-top: 30px; font-size: 12px; color: #9090a0;">
-                    This email was sent by Staff Scheduler on behalf of {business_name}.
+                    This email was sent by Staff Scheduler on behalf of $business_name.
                 </p>
             </td>
         </tr>
     </table>
 </body>
 </html>
-"""
-        
-        text_body = f"""
-Hi {employee_name}!
+"""))
+
+_INVITE_TEXT = Template("""
+Hi $employee_name!
 
-You've been invited to access the employee portal at {business_name}.
+You've been invited to access the employee portal at $business_name.
 
 From the portal, you can:
 - View your weekly schedule
@@ -306,46 +221,18 @@ From the portal, you can:
 - Update your availability
 - Request time off
 - Request shift swaps
-{credentials_text}
+$credentials_text
 Click here to view your schedule:
-{portal_url}
+$portal_url
 
 ---
-This email was sent by Staff Scheduler on behalf of {business_name}.
-"""
-        
-        return self.send_email(to_email, subject, html_body, text_body)
-    
-    def send_swap_request_notification(
-        self,
-        to_email: str,
-        recipient_name: str,
-        requester_name: str,
-        business_name: str,
-        shift_details: str,
-        eligibility_type: str,  # 'pickup' or 'swap_only'
-        portal_url: str
-    ) -> Tuple[bool, str]:
-        """
-        Send a shift swap request notification to an eligible employee.
-        
-        Args:
-            to_email: Recipient's email address
-            recipient_name: Recipient's name
-            requester_name: Name of the person requesting the swap
-            business_name: Name of the business
-            shift_details: Description of the shift (e.g., "Monday 9am-5pm")
-            eligibility_type: 'pickup' or 'swap_only'
-            portal_url: Full URL to the employee portal
-            
-        Returns:
-            Tuple of (success: bool, message: str)
-        """
-        subject = f"Shift available: {shift_details} at {business_name}"
-        
-        action_text = "pick up this shift" if eligibility_type == 'pickup' else "swap for this shift"
-        
-        html_body = f"""
+This email was sent by Staff Scheduler on behalf of $business_name.
+""")
+
+
+# Swap and password reset templates; values substituted into the HTML ones are
+# escaped with _escaped()
+_SWAP_REQUEST_HTML = Template(_minify_html("""
 <!DOCTYPE html>
 <html>
 <head>
@@ -367,104 +254,73 @@ This email was sent by Staff Scheduler on behalf of {business_name}.
                         
                         <!-- Main Content -->
                         <h2 style="margin: 0 0 15px; font-size: 20px; color: #1a1a2e;">
-                            Hi {recipient_name}!
+                            Hi $recipient_name!
                         </h2>
                         
                         <p style="margin: 0 0 20px; font-size: 16px; color: #5a5a70; line-height: 1.6;">
-                            <strong>{requester_name}</strong> is looking for someone to cover their shift at <strong>{business_name}</strong>.
+                            <strong>$requester_name</strong> is looking for someone to cover their shift at <strong>$business_name</strong>.
                         </p>
                         
                         <!-- Shift Details Box -->
                         <div style="background-color: #fef3c7; border-radius: 10px; padding: 20px; margin: 25px 0; border-left: 4px solid #f59e0b;">
                             <p style="margin: 0; font-size: 18px; color: #92400e; font-weight: 600;">
-                                📅 {shift_details}
+                                📅 $shift_details
                             </p>
                         </div>
                         
                         <p style="margin: 0 0 25px; font-size: 16px; color: #5a5a70; line-height: 1.6;">
-                            You can <strong>{action_text}</strong>. Tap the button below to respond.
+                            You can <strong>$action_text</strong>. Tap the button below to respond.
                         </p>
                         
                         <!-- CTA Button -->
                         <div style="text-align: center; margin: 30px 0;">
-                            <a href="{portal_url}" style="display: inline-block; padding: 14px 32px; background: linear-gradient(135deg, #f59e0b 0%, #ef4444 100%); color: #ffffff; text-decoration: none; border-radius: 10px; font-weight: 600; font-size: 16px;">
+                            <a href="$portal_url" style="display: inline-block; padding: 14px 32px; background: linear-gradient(135deg, #f59e0b 0%, #ef4444 100%); color: #ffffff; text-decoration: none; border-radius: 10px; font-weight: 600; font-size: 16px;">
                                 View Swap Request
                             </a>
                         </div>
                         
                         <p style="margin: 25px 0 0; font-size: 14px; color: #9090a0; line-height: 1.6;">
                             Or copy and paste this link into your browser:<br>
-                            <a href="{portal_url}" style="color: #f59e0b; word-break: break-all;">{portal_url}</a>
+                            <a href="$portal_url" style="color: #f59e0b; word-break: break-all;">$portal_url</a>
                         </p>
                     </div>
                 </div>
                 
                 <!-- Footer -->
                 <p style="text-align: center; margin-top: 30px; font-size: 12px; color: #9090a0;">
-                    This email was sent by Staff Scheduler on behalf of {business_name}.
+                    This email was sent by Staff Scheduler on behalf of $business_name.
                 </p>
             </td>
         </tr>
     </table>
 </body>
 </html>
-"""
-        
-        text_body = f"""
-Hi {recipient_name}!
+"""))
+
+_SWAP_REQUEST_TEXT = Template("""
+Hi $recipient_name!
 
-{requester_name} is looking for someone to cover their shift at {business_name}.
+$requester_name is looking for someone to cover their shift at $business_name.
 
 Shift Details:
-{shift_details}
+$shift_details
 
-You can {action_text}. Click here to respond:
-{portal_url}
+You can $action_text. Click here to respond:
+$portal_url
 
 ---
-This email was sent by Staff Scheduler on behalf of {business_name}.
-"""
-        
-        return self.send_email(to_email, subject, html_body, text_body)
-    
-    def send_swap_response_notification(
-        self,
-        to_email: str,
-        requester_name: str,
-        responder_name: str,
-        business_name: str,
-        shift_details: str,
-        response: str,  # 'accepted' or 'declined'
-        swap_shift_details: Optional[str],  # Details of swap shift if it was a swap
-        portal_url: str
-    ) -> Tuple[bool, str]:
-        """
-        Send notification to requester when someone responds to their swap request.
-        """
-        if response == 'accepted':
-            subject = f"Great news! {responder_name} accepted your shift swap"
-            emoji = "✅"
-            action = "accepted"
-            color_start = "#10b981"
-            color_end = "#059669"
-        else:
-            subject = f"{responder_name} declined your shift swap request"
-            emoji = "❌"
-            action = "declined"
-            color_start = "#ef4444"
-            color_end = "#dc2626"
-        
-        swap_info = ""
-        if swap_shift_details and response == 'accepted':
-            swap_info = f"""
+This email was sent by Staff Scheduler on behalf of $business_name.
+""")
+
+_SWAP_RESPONSE_SWAP_INFO_HTML = Template(_minify_html("""
                         <div style="background-color: #e0f2fe; border-radius: 10px; padding: 20px; margin: 15px 0; border-left: 4px solid #0ea5e9;">
                             <p style="margin: 0; font-size: 16px; color: #0369a1; font-weight: 600;">
-                                🔄 In exchange, you'll take their shift: {swap_shift_details}
+                                🔄 In exchange, you'll take their shift: $swap_shift_details
                             </p>
                         </div>
-"""
-        
-        html_body = f"""
+"""))
+
+_SWAP_RESPONSE_HTML = Template(_minify_html("""
 <!DOCTYPE html>
 <html>
 <head>
@@ -475,32 +331,32 @@ This email was sent by Staff Scheduler on behalf of {business_name}.
     <table width="100%" cellpadding="0" cellspacing="0" style="max-width: 600px; margin: 0 auto; padding: 40px 20px;">
         <tr>
             <td>
-                <div style="background: linear-gradient(135deg, {color_start} 0%, {color_end} 100%); padding: 3px; border-radius: 16px;">
+                <div style="background: linear-gradient(135deg, $color_start 0%, $color_end 100%); padding: 3px; border-radius: 16px;">
                     <div style="background-color: #ffffff; border-radius: 14px; padding: 40px;">
                         <div style="text-align: center; margin-bottom: 30px;">
                             <h1 style="margin: 0; font-size: 24px; color: #1a1a2e;">
-                                {emoji} Swap Request {action.title()}
+                                $emoji Swap Request $action_title
                             </h1>
                         </div>
                         
                         <h2 style="margin: 0 0 15px; font-size: 20px; color: #1a1a2e;">
-                            Hi {requester_name}!
+                            Hi $requester_name!
                         </h2>
                         
                         <p style="margin: 0 0 20px; font-size: 16px; color: #5a5a70; line-height: 1.6;">
-                            <strong>{responder_name}</strong> has {action} your request to swap the shift:
+                            <strong>$responder_name</strong> has $action your request to swap the shift:
                         </p>
                         
                         <div style="background-color: #f3f4f6; border-radius: 10px; padding: 20px; margin: 25px 0;">
                             <p style="margin: 0; font-size: 18px; color: #374151; font-weight: 600;">
-                                📅 {shift_details}
+                                📅 $shift_details
                             </p>
                         </div>
                         
-                        {swap_info}
+                        $swap_info
                         
                         <div style="text-align: center; margin: 30px 0;">
-                            <a href="{portal_url}" style="display: inline-block; padding: 14px 32px; background: linear-gradient(135deg, {color_start} 0%, {color_end} 100%); color: #ffffff; text-decoration: none; border-radius: 10px; font-weight: 600; font-size: 16px;">
+                            <a href="$portal_url" style="display: inline-block; padding: 14px 32px; background: linear-gradient(135deg, $color_start 0%, $color_end 100%); color: #ffffff; text-decoration: none; border-radius: 10px; font-weight: 600; font-size: 16px;">
                                 View Updated Schedule
                             </a>
                         </div>
@@ -508,59 +364,39 @@ This email was sent by Staff Scheduler on behalf of {business_name}.
                 </div>
                 
                 <p style="text-align: center; margin-top: 30px; font-size: 12px; color: #9090a0;">
-                    This email was sent by Staff Scheduler on behalf of {business_name}.
+                    This email was sent by Staff Scheduler on behalf of $business_name.
                 </p>
             </td>
         </tr>
     </table>
 </body>
 </html>
-"""
-        
-        text_body = f"""
-Hi {requester_name}!
+"""))
+
+_SWAP_RESPONSE_TEXT = Template("""
+Hi $requester_name!
 
-{responder_name} has {action} your request to swap the shift:
-{shift_details}
+$responder_name has $action your request to swap the shift:
+$shift_details
 
-{"In exchange, you'll take their shift: " + swap_shift_details if swap_shift_details and response == 'accepted' else ""}
+$swap_line
 
 View your updated schedule:
-{portal_url}
+$portal_url
 
 ---
-This email was sent by Staff Scheduler on behalf of {business_name}.
-"""
-        
-        return self.send_email(to_email, subject, html_body, text_body)
+This email was sent by Staff Scheduler on behalf of $business_name.
+""")
 
-    def send_swap_completed_manager_notification(
-        self,
-        to_email: str,
-        manager_name: str,
-        requester_name: str,
-        accepter_name: str,
-        business_name: str,
-        shift_details: str,
-        swap_shift_details: Optional[str],
-        schedule_url: str
-    ) -> Tuple[bool, str]:
-        """
-        Send notification to manager when a shift swap is completed.
-        """
-        subject = f"Shift swap completed: {requester_name} ↔ {accepter_name}"
-        
-        swap_info = ""
-        if swap_shift_details:
-            swap_info = f"""
+_SWAP_COMPLETED_SWAP_INFO_HTML = Template(_minify_html("""
                         <div style="background-color: #e0f2fe; border-radius: 10px; padding: 15px; margin: 15px 0; border-left: 4px solid #0ea5e9;">
                             <p style="margin: 0; font-size: 14px; color: #0369a1;">
-                                🔄 <strong>{accepter_name}</strong> traded their shift: {swap_shift_details}
+                                🔄 <strong>$accepter_name</strong> traded their shift: $swap_shift_details
                             </p>
                         </div>
-"""
-        
-        html_body = f"""
+"""))
+
+_SWAP_COMPLETED_HTML = Template(_minify_html("""
 <!DOCTYPE html>
 <html>
 <head>
@@ -580,26 +416,26 @@ This email was sent by Staff Scheduler on behalf of {business_name}.
                         </div>
                         
                         <p style="font-size: 16px; color: #4a4a5a; margin: 0 0 20px;">
-                            Hi {manager_name},
+                            Hi $manager_name,
                         </p>
                         
                         <p style="font-size: 16px; color: #4a4a5a; margin: 0 0 20px;">
-                            A shift swap has been completed at <strong>{business_name}</strong>. The schedule has been automatically updated.
+                            A shift swap has been completed at <strong>$business_name</strong>. The schedule has been automatically updated.
                         </p>
                         
                         <div style="background-color: #f3e8ff; border-radius: 10px; padding: 20px; margin: 20px 0;">
                             <p style="margin: 0 0 10px; font-size: 16px; color: #1a1a2e;">
-                                <strong>Original shift:</strong> {shift_details}
+                                <strong>Original shift:</strong> $shift_details
                             </p>
                             <p style="margin: 0 0 10px; font-size: 14px; color: #6b6b7b;">
-                                <span style="text-decoration: line-through;">{requester_name}</span> → <strong style="color: #7c3aed;">{accepter_name}</strong>
+                                <span style="text-decoration: line-through;">$requester_name</span> → <strong style="color: #7c3aed;">$accepter_name</strong>
                             </p>
                         </div>
                         
-                        {swap_info}
+                        $swap_info
                         
                         <div style="text-align: center; margin: 30px 0;">
-                            <a href="{schedule_url}" style="display: inline-block; padding: 14px 32px; background: linear-gradient(135deg, #8b5cf6 0%, #6366f1 100%); color: #ffffff; text-decoration: none; border-radius: 10px; font-weight: 600; font-size: 16px;">
+                            <a href="$schedule_url" style="display: inline-block; padding: 14px 32px; background: linear-gradient(135deg, #8b5cf6 0%, #6366f1 100%); color: #ffffff; text-decoration: none; border-radius: 10px; font-weight: 600; font-size: 16px;">
                                 View Updated Schedule
                             </a>
                         </div>
@@ -618,50 +454,28 @@ This email was sent by Staff Scheduler on behalf of {business_name}.
     </table>
 </body>
 </html>
-"""
-        
-        text_body = f"""
-Hi {manager_name},
+"""))
 
-A shift swap has been completed at {business_name}. The schedule has been automatically updated.
+_SWAP_COMPLETED_TEXT = Template("""
+Hi $manager_name,
 
-Original shift: {shift_details}
-{requester_name} → {accepter_name}
+A shift swap has been completed at $business_name. The schedule has been automatically updated.
 
-{"In exchange, " + accepter_name + " traded their shift: " + swap_shift_details if swap_shift_details else ""}
+Original shift: $shift_details
+$requester_name → $accepter_name
+
+$swap_line
 
 View the updated schedule:
-{schedule_url}
+$schedule_url
 
 No action is required - this is for your records.
 
 ---
 This notification was sent by Staff Scheduler.
-"""
-        
-        return self.send_email(to_email, subject, html_body, text_body)
+""")
 
-
-    def send_password_reset(
-        self,
-        to_email: str,
-        user_name: str,
-        reset_url: str
-    ) -> Tuple[bool, str]:
-        """
-        Send a password reset email.
-        
-        Args:
-            to_email: User's email address
-            user_name: User's name or username
-            reset_url: Full URL to reset password page
-            
-        Returns:
-            Tuple of (success: bool, message: str)
-        """
-        subject = "Reset your Staff Scheduler password"
-        
-        html_body = f"""
+_PASSWORD_RESET_HTML = Template(_minify_html("""
 <!DOCTYPE html>
 <html>
 <head>
@@ -683,7 +497,7 @@ This notification was sent by Staff Scheduler.
                         
                         <!-- Main Content -->
                         <h2 style="margin: 0 0 15px; font-size: 20px; color: #1a1a2e;">
-                            Hi {user_name}!
+                            Hi $user_name!
                         </h2>
                         
                         <p style="margin: 0 0 20px; font-size: 16px; color: #5a5a70; line-height: 1.6;">
@@ -696,14 +510,14 @@ This notification was sent by Staff Scheduler.
                         
                         <!-- CTA Button -->
                         <div style="text-align: center; margin: 30px 0;">
-                            <a href="{reset_url}" style="display: inline-block; padding: 14px 32px; background: linear-gradient(135deg, #467df6 0%, #a855f7 100%); color: #ffffff; text-decoration: none; border-radius: 10px; font-weight: 600; font-size: 16px;">
+                            <a href="$reset_url" style="display: inline-block; padding: 14px 32px; background: linear-gradient(135deg, #467df6 0%, #a855f7 100%); color: #ffffff; text-decoration: none; border-radius: 10px; font-weight: 600; font-size: 16px;">
                                 Reset Password
                             </a>
                         </div>
                         
                         <p style="margin: 25px 0 0; font-size: 14px; color: #9090a0; line-height: 1.6;">
                             Or copy and paste this link into your browser:<br>
-                            <a href="{reset_url}" style="color: #467df6; word-break: break-all;">{reset_url}</a>
+                            <a href="$reset_url" style="color: #467df6; word-break: break-all;">$reset_url</a>
                         </p>
                         
                         <hr style="border: none; border-top: 1px solid #e5e5e5; margin: 30px 0;">
@@ -723,33 +537,1213 @@ This notification was sent by Staff Scheduler.
     </table>
 </body>
 </html>
-"""
-        
-        text_body = f"""
-Hi {user_name}!
+"""))
+
+_PASSWORD_RESET_TEXT = Template("""
+Hi $user_name!
 
 We received a request to reset your password for your Staff Scheduler account.
 
 Click the link below to create a new password. This link will expire in 1 hour.
 
-{reset_url}
+$reset_url
 
 If you didn't request this password reset, you can safely ignore this email. Your password will not be changed.
 
 ---
 This email was sent by Staff Scheduler.
-"""
+""")
+
+
+def _jittered(delay: float) -> float:
+    """A retry delay randomized to between half and one and a half times `delay`."""
+    return delay * random.uniform(0.5, 1.5)
+
+
+def _escaped(**fields) -> dict:
+    """HTML-escape each field value once, for substituting into an HTML template."""
+    return {name: html.escape(str(value)) for name, value in fields.items()}
+
+
+def _header_value(value: str) -> str:
+    """A header value on one line, RFC 2047-encoded if it isn't plain ASCII."""
+    value = value.replace('\r', ' ').replace('\n', ' ')
+    if value.isascii():
+        return value
+    return Header(value, 'utf-8').encode(linesep='\r\n')
+
+
+def _build_smtp_message(
+    from_header: str,
+    to_email: str,
+    subject: str,
+    html_body: str,
+    text_body: Optional[str] = None
+) -> bytes:
+    """
+    Render a multipart/alternative email as RFC 5322 bytes.
+    
+    Same shape as MIMEMultipart + MIMEText (UTF-8, base64 parts) but written
+    directly, skipping the email package's per-message object construction.
+    """
+    boundary = f"=={uuid.uuid4().hex}=="
+    lines = [
+        f"Subject: {_header_value(subject)}",
+        f"From: {from_header}",
+        f"To: {_header_value(to_email)}",
+        "MIME-Version: 1.0",
+        f'Content-Type: multipart/alternative; boundary="{boundary}"',
+        "",
+    ]
+    parts = [(text_body, 'plain')] if text_body else []
+    parts.append((html_body, 'html'))
+    for body, subtype in parts:
+        lines += [
+            f"--{boundary}",
+            f'Content-Type: text/{subtype}; charset="utf-8"',
+            "MIME-Version: 1.0",
+            "Content-Transfer-Encoding: base64",
+            "",
+            base64.encodebytes(body.encode('utf-8')).decode('ascii').replace('\n', '\r\n'),
+        ]
+    lines += [f"--{boundary}--", ""]
+    return '\r\n'.join(lines).encode('ascii')
+
+
+def _pipelined_sendmail(server: 'smtplib.SMTP', from_addr: str, to_addr: str, msg: bytes):
+    """
+    sendmail() for one recipient, with MAIL, RCPT and DATA pipelined (RFC 2920).
+    
+    The three commands go out in one write and their replies are read back
+    together, saving two round-trips per message. Servers that don't
+    advertise PIPELINING get a plain sendmail(). Raises the same smtplib
+    exceptions as sendmail().
+    """
+    import smtplib
+    
+    server.ehlo_or_helo_if_needed()
+    if not server.has_extn('pipelining'):
+        server.sendmail(from_addr, [to_addr], msg)
+        return
+    
+    server.send(
+        f"MAIL FROM:{smtplib.quoteaddr(from_addr)}\r\n"
+        f"RCPT TO:{smtplib.quoteaddr(to_addr)}\r\n"
+        "DATA\r\n"
+    )
+    mail_code, mail_resp = server.getreply()
+    rcpt_code, rcpt_resp = server.getreply()
+    data_code, data_resp = server.getreply()
+    
+    if mail_code != 250 or rcpt_code not in (250, 251) or data_code != 354:
+        if data_code == 354:
+            # DATA was accepted without a valid envelope; ending it would send
+            # an empty message, so drop the connection instead of resetting
+            server.close()
+        else:
+            try:
+                server.rset()
+            except smtplib.SMTPServerDisconnected:
+                pass
+        if mail_code != 250:
+            raise smtplib.SMTPSenderRefused(mail_code, mail_resp, from_addr)
+        if rcpt_code not in (250, 251):
+            raise smtplib.SMTPRecipientsRefused({to_addr: (rcpt_code, rcpt_resp)})
+        raise smtplib.SMTPDataError(data_code, data_resp)
+    
+    # Dot-stuff and terminate the message, as SMTP.data() does
+    data = re.sub(rb'(?m)^\.', b'..', msg)
+    if not data.endswith(b'\r\n'):
+        data += b'\r\n'
+    server.send(data + b'.\r\n')
+    code, resp = server.getreply()
+    if code != 250:
+        raise smtplib.SMTPDataError(code, resp)
+
+
+@lru_cache(maxsize=128)
+def _invite_shells(business_name: str) -> Tuple[Template, Template]:
+    """
+    HTML/text invitation templates with the business name already filled in.
+    
+    Bulk invites for one business reuse the same pair, so only the
+    employee-specific fields are substituted per message.
+    """
+    html_name = html.escape(business_name).replace('$', '$$')
+    text_name = business_name.replace('$', '$$')
+    return (
+        Template(_INVITE_HTML.safe_substitute(business_name=html_name)),
+        Template(_INVITE_TEXT.safe_substitute(business_name=text_name)),
+    )
+
+
+@lru_cache(maxsize=1)
+def _email_settings() -> dict:
+    """
+    Email configuration from the environment (see the module docstring).
+    
+    Read once per process; call _email_settings.cache_clear() after changing
+    the environment (e.g. in a script or test that switches providers).
+    """
+    return {
+        'resend_api_key': os.environ.get('RESEND_API_KEY', ''),
+        'resend_from_email': os.environ.get('RESEND_FROM_EMAIL', 'onboarding@resend.dev'),
+        'resend_rps': float(os.environ.get('RESEND_RPS', 2)),
+        'server': os.environ.get('MAIL_SERVER', 'smtp.gmail.com'),
+        'port': int(os.environ.get('MAIL_PORT', 587)),
+        'username': os.environ.get('MAIL_USERNAME', ''),
+        'password': os.environ.get('MAIL_PASSWORD', ''),
+        'from_name': os.environ.get('MAIL_FROM_NAME', 'Staff Scheduler'),
+        'max_messages_per_conn': int(os.environ.get('MAIL_MAX_MESSAGES_PER_CONN', SMTP_MAX_MESSAGES_PER_CONN)),
+    }
+
+
+class EmailService:
+    """Email service supporting Resend API and SMTP."""
+    
+    def __init__(self):
+        settings = _email_settings()
+        
+        # Resend API (preferred for cloud platforms)
+        self.resend_api_key = settings['resend_api_key']
+        self.resend_from_email = settings['resend_from_email']
+        
+        # SMTP settings (fallback)
+        self.server = settings['server']
+        self.port = settings['port']
+        self.username = settings['username']
+        self.password = settings['password']
+        self.from_name = settings['from_name']
+        self.max_messages_per_conn = settings['max_messages_per_conn']
+        
+        # Check which method is available
+        self.use_resend = bool(self.resend_api_key)
+        self.use_smtp = bool(self.username and self.password)
+        self.enabled = self.use_resend or self.use_smtp
+        
+        # The send route is fixed by the configuration, so pick it once here
+        # instead of branching in send_email on every call
+        if not self.enabled:
+            self.send_email = self._send_disabled
+        elif not self.use_resend:
+            self.send_email = self._send_via_smtp
+        
+        # Constant parts of every Resend request, built once
+        self._resend_from = f"{self.from_name} <{self.resend_from_email}>"
+        self._resend_headers = {
+            "Authorization": f"Bearer {self.resend_api_key}",
+            "Content-Type": "application/json"
+        }
+        self._resend_gzip_headers = dict(self._resend_headers, **{"Content-Encoding": "gzip"})
+        # Cleared if Resend turns out not to accept gzip request bodies
+        self._resend_gzip = True
+        
+        # Keep-alive HTTPS connection to Resend and logged-in SMTP connection,
+        # reused per thread (see _post_to_resend / _get_smtp)
+        self._resend_local = threading.local()
+        self._smtp_local = threading.local()
+        # One TLS context for both, so the CA bundle is loaded once rather
+        # than on every new connection
+        self._ssl_context = ssl.create_default_context() if self.enabled else None
+        
+        # Pace Resend calls to its per-second quota (RESEND_RPS, Resend's default
+        # is 2) across all threads instead of bursting into 429s
+        self._resend_min_interval = 1.0 / max(settings['resend_rps'], 0.1)
+        self._resend_next_at = 0.0
+        self._resend_pace_lock = threading.Lock()
+        
+        # Circuit breaker: consecutive Resend outage failures and when to try again
+        self._resend_failures = 0
+        self._resend_open_until = 0.0
+        self._breaker_lock = threading.Lock()
+        
+        # Per-process send outcomes ("resend_sent", "smtp_failed", ...), see stats()
+        self._stats = Counter()
+        self._stats_lock = threading.Lock()
+        
+        # Background send queue, drained by a worker thread started on first use
+        self._queue = queue.Queue(maxsize=1000)
+        self._worker_thread = None
+        self._worker_lock = threading.Lock()
+    
+    def is_configured(self) -> bool:
+        """Check if email is properly configured."""
+        return self.enabled
+    
+    def stats(self) -> dict:
+        """Emails sent/failed per method by this process since it started."""
+        with self._stats_lock:
+            return dict(self._stats)
+    
+    def _count(self, method: str, success: bool, n: int = 1):
+        """Add n messages to the method's sent or failed counter."""
+        with self._stats_lock:
+            self._stats[f"{method}_{'sent' if success else 'failed'}"] += n
+    
+    def _send_via_resend(
+        self,
+        to_email: str,
+        subject: str,
+        html_body: str,
+        text_body: Optional[str] = None
+    ) -> Tuple[bool, str]:
+        """Send email via Resend API."""
+        try:
+            data = {
+                "from": self._resend_from,
+                "to": [to_email],
+                "subject": subject,
+                "html": html_body
+            }
+            if text_body:
+                data["text"] = text_body
+            
+            status, body = self._post_to_resend_with_retry("/emails", data)
+            if status >= 400:
+                return False, f"Resend API error ({status}): {body}"
+            
+            result = json.loads(body)
+            return True, f"Email sent via Resend (id: {result.get('id', 'unknown')})"
+                
+        except (OSError, http.client.HTTPException) as e:
+            return False, f"Resend network error: {str(e)}"
+        except Exception as e:
+            return False, f"Resend error: {str(e)}"
+    
+    def _send_batch_via_resend(self, messages: List[Tuple[str, str, str, Optional[str]]]) -> Tuple[bool, str, List[str]]:
+        """
+        Send up to RESEND_BATCH_SIZE (to_email, subject, html_body, text_body) messages in one Resend call.
+        
+        Returns:
+            Tuple of (success: bool, message: str, ids: list of Resend email IDs in message order)
+        """
+        try:
+            payloads = []
+            for to_email, subject, html_body, text_body in messages:
+                data = {
+                    "from": self._resend_from,
+                    "to": [to_email],
+                    "subject": subject,
+                    "html": html_body
+                }
+                if text_body:
+                    data["text"] = text_body
+                payloads.append(data)
+            
+            status, body = self._post_to_resend_with_retry("/emails/batch", payloads)
+            if status >= 400:
+                return False, f"Resend API error ({status}): {body}", []
+            
+            ids = [item.get('id', 'unknown') for item in json.loads(body).get('data', [])]
+            return True, f"Batch of {len(messages)} sent via Resend", ids
+        
+        except (OSError, http.client.HTTPException) as e:
+            return False, f"Resend network error: {str(e)}", []
+        except Exception as e:
+            return False, f"Resend error: {str(e)}", []
+    
+    def _post_to_resend_with_retry(self, path: str, payload) -> Tuple[int, str]:
+        """
+        _post_to_resend, retried after SEND_RETRY_DELAYS on network errors,
+        broken HTTP responses and RESEND_RETRYABLE_STATUSES.
+        
+        Every attempt carries the same Idempotency-Key, so a retry of a request
+        Resend did process (e.g. the response timed out) doesn't send it twice.
+        """
+        idempotency_key = str(uuid.uuid4())
+        message_count = len(payload) if isinstance(payload, list) else 1
+        for delay in SEND_RETRY_DELAYS + (None,):
+            try:
+                status, body = self._post_to_resend(path, payload, idempotency_key)
+                if status not in RESEND_RETRYABLE_STATUSES or delay is None:
+                    self._count('resend', status < 400, message_count)
+                    # A 4xx rejection still means Resend itself is up
+                    self._record_resend_health(status not in RESEND_RETRYABLE_STATUSES)
+                    return status, body
+                reason = f"HTTP {status}"
+            except (OSError, http.client.HTTPException) as e:
+                # HTTPException covers responses cut off or garbled mid-read
+                # (IncompleteRead, BadStatusLine, ...), which aren't OSErrors
+                if delay is None:
+                    self._count('resend', False, message_count)
+                    self._record_resend_health(False)
+                    raise
+                reason = str(e)
+            delay = _jittered(delay)
+            print(f"[EMAIL] Resend request failed ({reason}), retrying in {delay:.1f}s", flush=True)
+            time.sleep(delay)
+    
+    def _post_to_resend(self, path: str, payload, idempotency_key: Optional[str] = None) -> Tuple[int, str]:
+        """
+        POST JSON to the Resend API over this thread's keep-alive connection.
+        
+        Reusing the connection skips the TCP + TLS handshake on every email after
+        the first. If a reused connection turns out to have been closed by the
+        server while idle, reconnect and send once more. Calls are paced by
+        _wait_for_resend_slot; a 429 pushes the next slot out by Retry-After
+        and the request is sent once more.
+        
+        Bodies over RESEND_GZIP_MIN_BYTES (batches, large templates) are sent
+        gzip-compressed. If Resend rejects a compressed body for its encoding
+        (see _rejects_gzip) but accepts the same payload uncompressed,
+        compression is switched off for this service.
+        
+        Returns:
+            Tuple of (HTTP status, response body)
+        """
+        # Compact separators and raw UTF-8 (the templates carry emoji, which
+        # ensure_ascii would expand to \uXXXX surrogate pairs)
+        plain_body = json.dumps(payload, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+        compressed = self._resend_gzip and len(plain_body) > RESEND_GZIP_MIN_BYTES
+        plain_headers = self._resend_headers
+        gzip_headers = self._resend_gzip_headers
+        if idempotency_key:
+            plain_headers = dict(plain_headers, **{"Idempotency-Key": idempotency_key})
+            gzip_headers = dict(gzip_headers, **{"Idempotency-Key": idempotency_key})
+        if compressed:
+            body, headers = gzip.compress(plain_body, compresslevel=1), gzip_headers
+        else:
+            body, headers = plain_body, plain_headers
+        
+        rate_limited = False
+        gzip_rejected = False
+        while True:
+            self._wait_for_resend_slot()
+            conn = getattr(self._resend_local, 'conn', None)
+            reused = conn is not None
+            if conn is None:
+                conn = self._open_resend()
+                self._resend_local.conn = conn
+            try:
+                conn.request("POST", path, body=body, headers=headers)
+                response = conn.getresponse()
+                text = response.read().decode('utf-8')
+                if compressed and self._rejects_gzip(response.status, text):
+                    # The API couldn't read the compressed body, so it wasn't
+                    # processed; resend it uncompressed under a fresh key, since
+                    # the body differs from the one the old key was sent with
+                    compressed, gzip_rejected = False, True
+                    body = plain_body
+                    headers = plain_headers
+                    if idempotency_key:
+                        headers = dict(plain_headers, **{"Idempotency-Key": str(uuid.uuid4())})
+                    continue
+                if gzip_rejected and response.status < 400:
+                    print("[EMAIL] Resend rejected a gzip request body, sending uncompressed from now on", flush=True)
+                    self._resend_gzip = False
+                if response.status == 429 and not rate_limited:
+                    rate_limited = True
+                    retry_after = self._parse_retry_after(response.getheader('Retry-After'))
+                    if retry_after <= RESEND_MAX_RETRY_AFTER:
+                        print(f"[EMAIL] Resend rate limited, retrying in {retry_after:.1f}s", flush=True)
+                        self._defer_resend(retry_after)
+                        continue
+                return response.status, text
+            except (http.client.RemoteDisconnected, http.client.CannotSendRequest,
+                    ConnectionResetError, BrokenPipeError):
+                self._close_resend()
+                if not reused:
+                    raise
+            except Exception:
+                self._close_resend()
+                raise
+    
+    def _record_resend_health(self, reachable: bool):
+        """Update the circuit breaker after a Resend request's final outcome."""
+        # Per-thread note of the last outcome, for send_bulk's abort check
+        self._resend_local.outage = not reachable
+        with self._breaker_lock:
+            if reachable:
+                self._resend_failures = 0
+                return
+            self._resend_failures += 1
+            # Once open, a single failed probe after the cooldown re-opens it
+            if self._resend_failures >= RESEND_BREAKER_THRESHOLD:
+                if time.monotonic() >= self._resend_open_until:
+                    if self.use_smtp:
+                        print(f"[EMAIL] Resend unavailable, using SMTP for {RESEND_BREAKER_COOLDOWN}s", flush=True)
+                    else:
+                        print("[EMAIL] Resend unavailable and no SMTP fallback configured", flush=True)
+                self._resend_open_until = time.monotonic() + RESEND_BREAKER_COOLDOWN
+    
+    def _resend_bypassed(self) -> bool:
+        """True while the circuit breaker is open and SMTP can take Resend's place."""
+        return self.use_smtp and time.monotonic() < self._resend_open_until
+    
+    def _wait_for_resend_slot(self):
+        """
+        Sleep only as long as needed to keep Resend calls min_interval apart.
+        
+        Transactional sends book the next free slot straight away. send_bulk
+        threads only take a slot once it is due, so a burst of notifications
+        never has slots booked ahead of an invitation or password reset that
+        arrives mid-burst; the transactional send goes next.
+        """
+        bulk = getattr(self._resend_local, 'bulk', False)
+        while True:
+            with self._resend_pace_lock:
+                now = time.monotonic()
+                slot = max(now, self._resend_next_at)
+                if not bulk or slot == now:
+                    self._resend_next_at = slot + self._resend_min_interval
+                    break
+            time.sleep(slot - now)
+        if slot > now:
+            time.sleep(slot - now)
+    
+    def _defer_resend(self, seconds: float):
+        """Hold back every thread's next Resend call for at least `seconds`."""
+        with self._resend_pace_lock:
+            self._resend_next_at = max(self._resend_next_at, time.monotonic() + seconds)
+    
+    @staticmethod
+    def _rejects_gzip(status: int, body: str) -> bool:
+        """
+        Whether a response to a gzipped request says the encoding itself was refused.
+        
+        415 always does; a 400 only if its error mentions the encoding, so an
+        ordinary invalid payload (e.g. one bad address in a batch) isn't sent twice.
+        """
+        if status == 415:
+            return True
+        if status != 400:
+            return False
+        body = body.lower()
+        return any(word in body for word in ('encoding', 'gzip', 'compress'))
+    
+    @staticmethod
+    def _parse_retry_after(value: Optional[str]) -> float:
+        """Seconds from a Retry-After header (defaults to 1s if missing or not a number)."""
+        try:
+            return max(float(value), 0.0)
+        except (TypeError, ValueError):
+            return 1.0
+    
+    def _open_resend(self) -> http.client.HTTPSConnection:
+        """Connect to Resend with RESEND_CONNECT_TIMEOUT, then switch to RESEND_READ_TIMEOUT."""
+        conn = http.client.HTTPSConnection(RESEND_API_HOST, timeout=RESEND_CONNECT_TIMEOUT, context=self._ssl_context)
+        try:
+            conn.connect()
+        except Exception:
+            conn.close()
+            raise
+        conn.sock.settimeout(RESEND_READ_TIMEOUT)
+        conn.timeout = RESEND_READ_TIMEOUT
+        return conn
+    
+    def _close_resend(self):
+        """Drop this thread's cached Resend connection, if any."""
+        conn = getattr(self._resend_local, 'conn', None)
+        self._resend_local.conn = None
+        if conn is not None:
+            conn.close()
+    
+    def _send_via_smtp(
+        self,
+        to_email: str,
+        subject: str,
+        html_body: str,
+        text_body: Optional[str] = None
+    ) -> Tuple[bool, str]:
+        """Send email via SMTP."""
+        return self._send_many_via_smtp([(to_email, subject, html_body, text_body)])[0]
+    
+    def _send_many_via_smtp(self, messages: List[Tuple[str, str, str, Optional[str]]]) -> List[Tuple[bool, str]]:
+        """
+        Send (to_email, subject, html_body, text_body) messages back to back over SMTP.
+        
+        All messages go out on this thread's connection, which is checked once
+        before the first message instead of before each one. It is still
+        recycled every max_messages_per_conn messages. If the server looks
+        down (see BULK_ABORT_MIN_SENDS), the remaining messages fail without
+        being tried.
+        
+        Returns:
+            List of (success: bool, message: str), one per message, in order
+        """
+        import smtplib
+        
+        from_header = _header_value(formataddr((self.from_name, self.username)))
+        results = []
+        outage_failures = 0
+        server = None
+        for to_email, subject, html_body, text_body in messages:
+            if len(results) >= BULK_ABORT_MIN_SENDS and outage_failures * 3 >= len(results):
+                remaining = len(messages) - len(results)
+                print(f"[EMAIL] {outage_failures} of {len(results)} SMTP sends failed, skipping the remaining {remaining}", flush=True)
+                self._count('smtp', False, remaining)
+                results.extend([(False, "SMTP send skipped: the server kept failing earlier in this batch")] * remaining)
+                break
+            
+            msg = _build_smtp_message(from_header, to_email, subject, html_body, text_body)
+            
+            auth_failed = False
+            for delay in SEND_RETRY_DELAYS + (None,):
+                retryable = False
+                try:
+                    # Send on this thread's connection; if the server dropped it since
+                    # the liveness check, reconnect once and retry
+                    if server is None or self._smtp_local.sent >= self.max_messages_per_conn:
+                        server = self._get_smtp()
+                    try:
+                        _pipelined_sendmail(server, self.username, to_email, msg)
+                    except smtplib.SMTPServerDisconnected:
+                        self._close_smtp()
+                        server = self._get_smtp()
+                        _pipelined_sendmail(server, self.username, to_email, msg)
+                    self._smtp_local.sent += 1
+                    self._smtp_local.last_used = time.monotonic()
+                    
+                    result = (True, "Email sent via SMTP")
+                    
+                except smtplib.SMTPAuthenticationError:
+                    self._close_smtp()
+                    auth_failed = True
+                    result = (False, "SMTP authentication failed. Check your MAIL_USERNAME and MAIL_PASSWORD.")
+                except smtplib.SMTPResponseException as e:
+                    # 4xx replies (421 busy, 450/451/452 try later) are temporary
+                    retryable = 400 <= e.smtp_code < 500
+                    result = (False, f"SMTP error: {str(e)}")
+                except smtplib.SMTPServerDisconnected as e:
+                    retryable = True
+                    result = (False, f"SMTP error: {str(e)}")
+                except smtplib.SMTPException as e:
+                    result = (False, f"SMTP error: {str(e)}")
+                except TimeoutError:
+                    retryable = True
+                    result = (False, "SMTP connection timed out.")
+                except OSError as e:
+                    retryable = True
+                    result = (False, f"SMTP network error: {str(e)}")
+                except Exception as e:
+                    result = (False, f"SMTP error: {str(e)}")
+                
+                if not retryable or delay is None:
+                    break
+                # Start the next attempt on a fresh connection
+                self._close_smtp()
+                server = None
+                delay = _jittered(delay)
+                print(f"[EMAIL] SMTP send to {to_email} failed ({result[1]}), retrying in {delay:.1f}s", flush=True)
+                time.sleep(delay)
+            
+            if retryable:
+                outage_failures += 1
+                self._close_smtp()
+                server = None
+            if auth_failed:
+                # Every remaining message would fail the same way
+                self._count('smtp', False, len(messages) - len(results))
+                results.extend([result] * (len(messages) - len(results)))
+                break
+            self._count('smtp', result[0])
+            results.append(result)
+        return results
+    
+    def _get_smtp(self) -> 'smtplib.SMTP':
+        """
+        Get this thread's logged-in SMTP connection, opening one if needed.
+        
+        A cached connection is checked with RSET before reuse and replaced if the
+        server has dropped it, it has sent max_messages_per_conn messages or it
+        has been idle for SMTP_IDLE_TIMEOUT seconds, so the TLS handshake and
+        AUTH happen once per connection, not per email.
+        """
+        import smtplib
+        
+        server = getattr(self._smtp_local, 'conn', None)
+        if server is not None:
+            idle = time.monotonic() - self._smtp_local.last_used
+            if self._smtp_local.sent < self.max_messages_per_conn and idle < SMTP_IDLE_TIMEOUT:
+                try:
+                    server.rset()
+                    return server
+                except (smtplib.SMTPException, OSError):
+                    pass
+            self._close_smtp()
+        
+        if self.port == 465:
+            server = smtplib.SMTP_SSL(self.server, self.port, timeout=SMTP_CONNECT_TIMEOUT, context=self._ssl_context)
+        else:
+            server = smtplib.SMTP(self.server, self.port, timeout=SMTP_CONNECT_TIMEOUT)
+        try:
+            # Connected; allow longer for replies (STARTTLS keeps this timeout)
+            server.sock.settimeout(SMTP_READ_TIMEOUT)
+            server.timeout = SMTP_READ_TIMEOUT
+            if self.port != 465:
+                server.starttls(context=self._ssl_context)
+            server.login(self.username, self.password)
+        except Exception:
+            server.close()
+            raise
+        
+        self._smtp_local.conn = server
+        self._smtp_local.sent = 0
+        self._smtp_local.last_used = time.monotonic()
+        return server
+    
+    def _close_smtp(self):
+        """Drop this thread's cached SMTP connection, if any."""
+        server = getattr(self._smtp_local, 'conn', None)
+        self._smtp_local.conn = None
+        if server is not None:
+            import smtplib
+            try:
+                server.quit()
+            except (smtplib.SMTPException, OSError):
+                server.close()
+    
+    def send_email(
+        self,
+        to_email: str,
+        subject: str,
+        html_body: str,
+        text_body: Optional[str] = None
+    ) -> Tuple[bool, str]:
+        """
+        Send an email. Tries Resend API first, then falls back to SMTP.
+        
+        This is the route when Resend is configured; __init__ rebinds send_email
+        to _send_via_smtp for SMTP-only setups and to _send_disabled when
+        neither is configured.
+        
+        Returns:
+            Tuple of (success: bool, message: str)
+        """
+        if self._resend_bypassed():
+            return self._send_via_smtp(to_email, subject, html_body, text_body)
+        
+        # Try Resend API first (works on cloud platforms like Railway)
+        success, msg = self._send_via_resend(to_email, subject, html_body, text_body)
+        if success:
+            return success, msg
+        # Log Resend failure but continue to SMTP fallback
+        print(f"[EMAIL] Resend failed: {msg}", flush=True)
+        
+        # Fall back to SMTP
+        if self.use_smtp:
+            return self._send_via_smtp(to_email, subject, html_body, text_body)
+        
+        return success, msg
+    
+    def _send_disabled(self, *args, **kwargs) -> Tuple[bool, str]:
+        """send_email when neither Resend nor SMTP is configured."""
+        return False, "Email service not configured. Set RESEND_API_KEY or MAIL_USERNAME/MAIL_PASSWORD."
+    
+    def send_bulk(self, jobs: List[dict], max_workers: int = 8) -> List[Tuple[bool, str]]:
+        """
+        Send several independent emails, overlapping the Resend API round-trips.
+        
+        Resend sends run on up to max_workers threads (each keeps its own
+        keep-alive connection) and yield to transactional sends for rate-limit
+        slots; once Resend looks down (see BULK_ABORT_MIN_SENDS) the remaining
+        jobs skip it. SMTP is one conversation per connection, so SMTP-only
+        setups and messages Resend rejected are sent sequentially.
+        
+        Args:
+            jobs: Dicts of send_email keyword arguments
+                (to_email, subject, html_body, optionally text_body)
+            max_workers: Most Resend requests in flight at once
+            
+        Returns:
+            List of (success: bool, message: str), one per job, in order
+        """
+        if not self.enabled:
+            return [(False, "Email service not configured. Set RESEND_API_KEY or MAIL_USERNAME/MAIL_PASSWORD.")] * len(jobs)
+        
+        if not self.use_resend or self._resend_bypassed():
+            return self._send_many_via_smtp([
+                (job['to_email'], job['subject'], job['html_body'], job.get('text_body')) for job in jobs
+            ])
+        
+        tally_lock = threading.Lock()
+        tally = {'tried': 0, 'outages': 0}
+        
+        def send(job):
+            # Stop spending retries and timeouts on Resend once this batch has
+            # seen it fail (BULK_ABORT_MIN_SENDS), or once the breaker routes
+            # around it; skipped jobs go to SMTP below if configured
+            with tally_lock:
+                down = tally['tried'] >= BULK_ABORT_MIN_SENDS and tally['outages'] * 3 >= tally['tried']
+            if down or self._resend_bypassed():
+                return False, "Resend skipped: unavailable earlier in this batch"
+            # Pace behind transactional sends (see _wait_for_resend_slot)
+            self._resend_local.bulk = True
+            self._resend_local.outage = False
+            result = self._send_via_resend(**job)
+            with tally_lock:
+                tally['tried'] += 1
+                tally['outages'] += self._resend_local.outage
+            return result
+        
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='email-bulk') as executor:
+            results = list(executor.map(send, jobs))
+        
+        failed = [i for i, (success, msg) in enumerate(results) if not success]
+        for i in failed:
+            print(f"[EMAIL] Resend failed: {results[i][1]}", flush=True)
+        if failed and self.use_smtp:
+            retried = self._send_many_via_smtp([
+                (jobs[i]['to_email'], jobs[i]['subject'], jobs[i]['html_body'], jobs[i].get('text_body')) for i in failed
+            ])
+            for i, result in zip(failed, retried):
+                results[i] = result
+        return results
+    
+    def send_email_async(
+        self,
+        to_email: str,
+        subject: str,
+        html_body: str,
+        text_body: Optional[str] = None
+    ) -> Tuple[bool, str]:
+        """
+        Queue an email for the background worker and return immediately.
+        
+        Delivery failures are logged by the worker, not returned to the caller.
+        
+        Returns:
+            Tuple of (success: bool, message: str) - success means queued
+        """
+        if not self.enabled:
+            return False, "Email service not configured. Set RESEND_API_KEY or MAIL_USERNAME/MAIL_PASSWORD."
+        
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait((to_email, subject, html_body, text_body))
+        except queue.Full:
+            return False, "Email queue is full, try again shortly"
+        return True, "Email queued"
+    
+    def _ensure_worker(self):
+        """Start the queue worker thread if it isn't running (lazily, so it starts after a fork)."""
+        if self._worker_thread is not None and self._worker_thread.is_alive():
+            return
+        with self._worker_lock:
+            if self._worker_thread is None or not self._worker_thread.is_alive():
+                self._worker_thread = threading.Thread(target=self._worker, name='email-worker', daemon=True)
+                self._worker_thread.start()
+    
+    def prewarm(self):
+        """
+        Start the background worker ahead of the first queued email.
+        
+        The worker opens its Resend connection as soon as it starts, so the
+        DNS, TCP and TLS setup is done before an invitation is waiting on it.
+        """
+        if self.enabled:
+            self._ensure_worker()
+    
+    def _prewarm_resend(self):
+        """Open this thread's keep-alive Resend connection if it has none yet."""
+        if not self.use_resend or getattr(self._resend_local, 'conn', None) is not None:
+            return
+        try:
+            self._resend_local.conn = self._open_resend()
+        except OSError as e:
+            print(f"[EMAIL] Resend prewarm failed: {e}", flush=True)
+    
+    def flush(self, timeout: float = EMAIL_FLUSH_TIMEOUT) -> bool:
+        """
+        Wait up to timeout seconds for the queue worker to send everything queued.
+        
+        Called when a gunicorn worker exits, since the queue worker is a daemon
+        thread and anything still queued would otherwise be dropped silently.
+        Emails left unsent at the deadline are logged by recipient.
+        
+        Returns:
+            True if the queue drained in time
+        """
+        if self._queue.unfinished_tasks:
+            self._ensure_worker()
+        deadline = time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    unsent = [item[0] for item in list(self._queue.queue)]
+                    print(f"[EMAIL] Shutting down with {len(unsent)} queued email(s) unsent: {unsent}", flush=True)
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+    
+    def _worker(self):
+        """Send queued emails one at a time, logging failures."""
+        self._prewarm_resend()
+        while True:
+            to_email, subject, html_body, text_body = self._queue.get()
+            try:
+                success, msg = self.send_email(to_email, subject, html_body, text_body)
+                # Successes are tallied in stats(); only failures are worth a log line
+                if not success:
+                    print(f"[EMAIL] Queued send to {to_email} failed: {msg}", flush=True)
+            except Exception as e:
+                print(f"[EMAIL] Queued send to {to_email} raised: {e}", flush=True)
+            finally:
+                self._queue.task_done()
+    
+    def send_portal_invitation(
+        self,
+        to_email: str,
+        employee_name: str,
+        business_name: str,
+        portal_url: str,
+        login_url: Optional[str] = None,
+        temp_password: Optional[str] = None,
+        background: bool = False
+    ) -> Tuple[bool, str]:
+        """
+        Send a portal invitation email to an employee.
+        
+        Args:
+            to_email: Employee's email address
+            employee_name: Employee's name
+            business_name: Name of the business
+            portal_url: Full URL to the employee portal
+            login_url: URL to the login page (optional)
+            temp_password: Temporary password for first login (optional, if None user already has account)
+            background: Queue the email via send_email_async instead of sending inline
+            
+        Returns:
+            Tuple of (success: bool, message: str)
+        """
+        subject, html_body, text_body = self._render_portal_invitation(
+            to_email, employee_name, business_name, portal_url, login_url, temp_password
+        )
+        
+        if background:
+            return self.send_email_async(to_email, subject, html_body, text_body)
+        return self.send_email(to_email, subject, html_body, text_body)
+    
+    def send_portal_invitations_bulk(self, invitations: List[dict]) -> List[Tuple[bool, str]]:
+        """
+        Send several portal invitations, batched into as few API calls as possible.
+        
+        With Resend configured, invitations go out through the batch endpoint
+        (up to RESEND_BATCH_SIZE per request); a batch that fails falls back to
+        send_email one message at a time. SMTP-only setups send the whole list
+        back to back on one connection. An address that appears more than once
+        (ignoring case) is only emailed for its first invitation.
+        
+        Args:
+            invitations: Dicts of send_portal_invitation keyword arguments
+                (to_email, employee_name, business_name, portal_url, and
+                optionally login_url / temp_password)
+            
+        Returns:
+            List of (success: bool, message: str), one per invitation, in order;
+            duplicates share the result of the first send to that address
+        """
+        if not self.enabled:
+            return [(False, "Email service not configured. Set RESEND_API_KEY or MAIL_USERNAME/MAIL_PASSWORD.")] * len(invitations)
+        
+        messages = []
+        slots = []  # index into messages for each invitation
+        seen = {}
+        for invite in invitations:
+            key = invite['to_email'].strip().lower()
+            if key in seen:
+                slots.append(seen[key])
+                continue
+            seen[key] = len(messages)
+            slots.append(len(messages))
+            subject, html_body, text_body = self._render_portal_invitation(
+                invite['to_email'], invite['employee_name'], invite['business_name'], invite['portal_url'],
+                invite.get('login_url'), invite.get('temp_password')
+            )
+            messages.append((invite['to_email'], subject, html_body, text_body))
+        
+        results = []
+        for start in range(0, len(messages), RESEND_BATCH_SIZE):
+            chunk = messages[start:start + RESEND_BATCH_SIZE]
+            if not self.use_resend or self._resend_bypassed():
+                results.extend(self._send_many_via_smtp(chunk))
+                continue
+            success, msg, ids = self._send_batch_via_resend(chunk)
+            if success:
+                ids += ['unknown'] * (len(chunk) - len(ids))
+                results.extend((True, f"Email sent via Resend (id: {email_id})") for email_id in ids[:len(chunk)])
+                continue
+            print(f"[EMAIL] Resend batch failed: {msg}", flush=True)
+            results.extend(self.send_email(*message) for message in chunk)
+        return [results[slot] for slot in slots]
+    
+    def _render_portal_invitation(
+        self,
+        to_email: str,
+        employee_name: str,
+        business_name: str,
+        portal_url: str,
+        login_url: Optional[str] = None,
+        temp_password: Optional[str] = None
+    ) -> Tuple[str, str, str]:
+        """Build the (subject, html_body, text_body) of a portal invitation."""
+        subject = f"You're invited to view your schedule at {business_name}"
+        
+        # HTML-escape the employee-specific values once; the business name is
+        # already filled into the cached shells
+        safe_portal_url = html.escape(portal_url)
+        
+        # Build login credentials section if temp_password provided
+        if temp_password and login_url:
+            credentials_html = _INVITE_CREDENTIALS_HTML.substitute(
+                to_email=html.escape(to_email),
+                temp_password=html.escape(temp_password),
+                login_url=html.escape(login_url),
+            )
+            credentials_text = _INVITE_CREDENTIALS_TEXT.substitute(
+                to_email=to_email, temp_password=temp_password, login_url=login_url
+            )
+        else:
+            credentials_html = _INVITE_CTA_HTML.substitute(portal_url=safe_portal_url)
+            credentials_text = ""
+        
+        html_shell, text_shell = _invite_shells(business_name)
+        html_body = html_shell.substitute(
+            employee_name=html.escape(employee_name),
+            portal_url=safe_portal_url,
+            credentials_html=credentials_html,
+        )
+        text_body = text_shell.substitute(
+            employee_name=employee_name,
+            portal_url=portal_url,
+            credentials_text=credentials_text,
+        )
+        
+        return subject, html_body, text_body
+    
+    def send_swap_request_notification(
+        self,
+        to_email: str,
+        recipient_name: str,
+        requester_name: str,
+        business_name: str,
+        shift_details: str,
+        eligibility_type: str,  # 'pickup' or 'swap_only'
+        portal_url: str
+    ) -> Tuple[bool, str]:
+        """
+        Send a shift swap request notification to an eligible employee.
+        
+        Args:
+            to_email: Recipient's email address
+            recipient_name: Recipient's name
+            requester_name: Name of the person requesting the swap
+            business_name: Name of the business
+            shift_details: Description of the shift (e.g., "Monday 9am-5pm")
+            eligibility_type: 'pickup' or 'swap_only'
+            portal_url: Full URL to the employee portal
+            
+        Returns:
+            Tuple of (success: bool, message: str)
+        """
+        subject, html_body, text_body = self._render_swap_request_notification(
+            to_email, recipient_name, requester_name, business_name, shift_details, eligibility_type, portal_url
+        )
+        return self.send_email(to_email, subject, html_body, text_body)
+    
+    def send_swap_request_notifications_bulk(self, notifications: List[dict]) -> List[Tuple[bool, str]]:
+        """
+        Send swap request notifications to several employees at once via send_bulk.
+        
+        Args:
+            notifications: Dicts of send_swap_request_notification keyword arguments
+            
+        Returns:
+            List of (success: bool, message: str), one per notification, in order
+        """
+        jobs = []
+        for notification in notifications:
+            subject, html_body, text_body = self._render_swap_request_notification(**notification)
+            jobs.append({
+                'to_email': notification['to_email'],
+                'subject': subject,
+                'html_body': html_body,
+                'text_body': text_body,
+            })
+        return self.send_bulk(jobs)
+    
+    def _render_swap_request_notification(
+        self,
+        to_email: str,
+        recipient_name: str,
+        requester_name: str,
+        business_name: str,
+        shift_details: str,
+        eligibility_type: str,  # 'pickup' or 'swap_only'
+        portal_url: str
+    ) -> Tuple[str, str, str]:
+        """Build the (subject, html_body, text_body) of a swap request notification."""
+        subject = f"Shift available: {shift_details} at {business_name}"
+        
+        action_text = "pick up this shift" if eligibility_type == 'pickup' else "swap for this shift"
+        
+        html_body = _SWAP_REQUEST_HTML.substitute(
+            _escaped(
+                recipient_name=recipient_name,
+                requester_name=requester_name,
+                business_name=business_name,
+                shift_details=shift_details,
+                portal_url=portal_url,
+            ),
+            action_text=action_text,
+        )
+        
+        text_body = _SWAP_REQUEST_TEXT.substitute(
+            recipient_name=recipient_name,
+            requester_name=requester_name,
+            business_name=business_name,
+            shift_details=shift_details,
+            action_text=action_text,
+            portal_url=portal_url,
+        )
+        
+        return subject, html_body, text_body
+    
+    def send_swap_response_notification(
+        self,
+        to_email: str,
+        requester_name: str,
+        responder_name: str,
+        business_name: str,
+        shift_details: str,
+        response: str,  # 'accepted' or 'declined'
+        swap_shift_details: Optional[str],  # Details of swap shift if it was a swap
+        portal_url: str
+    ) -> Tuple[bool, str]:
+        """
+        Send notification to requester when someone responds to their swap request.
+        """
+        if response == 'accepted':
+            subject = f"Great news! {responder_name} accepted your shift swap"
+            emoji = "✅"
+            action = "accepted"
+            color_start = "#10b981"
+            color_end = "#059669"
+        else:
+            subject = f"{responder_name} declined your shift swap request"
+            emoji = "❌"
+            action = "declined"
+            color_start = "#ef4444"
+            color_end = "#dc2626"
+        
+        swap_info = ""
+        if swap_shift_details and response == 'accepted':
+            swap_info = _SWAP_RESPONSE_SWAP_INFO_HTML.substitute(_escaped(swap_shift_details=swap_shift_details))
+        
+        html_body = _SWAP_RESPONSE_HTML.substitute(
+            _escaped(
+                requester_name=requester_name,
+                responder_name=responder_name,
+                business_name=business_name,
+                shift_details=shift_details,
+                portal_url=portal_url,
+            ),
+            emoji=emoji,
+            action=action,
+            action_title=action.title(),
+            color_start=color_start,
+            color_end=color_end,
+            swap_info=swap_info,
+        )
+        
+        swap_line = ""
+        if swap_shift_details and response == 'accepted':
+            swap_line = "In exchange, you'll take their shift: " + swap_shift_details
+        text_body = _SWAP_RESPONSE_TEXT.substitute(
+            requester_name=requester_name,
+            responder_name=responder_name,
+            action=action,
+            shift_details=shift_details,
+            swap_line=swap_line,
+            portal_url=portal_url,
+            business_name=business_name,
+        )
+        
+        return self.send_email(to_email, subject, html_body, text_body)
+
+    def send_swap_completed_manager_notification(
+        self,
+        to_email: str,
+        manager_name: str,
+        requester_name: str,
+        accepter_name: str,
+        business_name: str,
+        shift_details: str,
+        swap_shift_details: Optional[str],
+        schedule_url: str
+    ) -> Tuple[bool, str]:
+        """
+        Send notification to manager when a shift swap is completed.
+        """
+        subject = f"Shift swap completed: {requester_name} ↔ {accepter_name}"
+        
+        swap_info = ""
+        if swap_shift_details:
+            swap_info = _SWAP_COMPLETED_SWAP_INFO_HTML.substitute(
+                _escaped(accepter_name=accepter_name, swap_shift_details=swap_shift_details)
+            )
+        
+        html_body = _SWAP_COMPLETED_HTML.substitute(
+            _escaped(
+                manager_name=manager_name,
+                requester_name=requester_name,
+                accepter_name=accepter_name,
+                business_name=business_name,
+                shift_details=shift_details,
+                schedule_url=schedule_url,
+            ),
+            swap_info=swap_info,
+        )
+        
+        swap_line = ""
+        if swap_shift_details:
+            swap_line = "In exchange, " + accepter_name + " traded their shift: " + swap_shift_details
+        text_body = _SWAP_COMPLETED_TEXT.substitute(
+            manager_name=manager_name,
+            requester_name=requester_name,
+            accepter_name=accepter_name,
+            business_name=business_name,
+            shift_details=shift_details,
+            swap_line=swap_line,
+            schedule_url=schedule_url,
+        )
         
         return self.send_email(to_email, subject, html_body, text_body)
 
 
-# Singleton instance
-_email_service = None
+    def send_password_reset(
+        self,
+        to_email: str,
+        user_name: str,
+        reset_url: str,
+        background: bool = False
+    ) -> Tuple[bool, str]:
+        """
+        Send a password reset email.
+        
+        Args:
+            to_email: User's email address
+            user_name: User's name or username
+            reset_url: Full URL to reset password page
+            background: Queue the email via send_email_async instead of sending inline
+            
+        Returns:
+            Tuple of (success: bool, message: str)
+        """
+        subject = "Reset your Staff Scheduler password"
+        
+        html_body = _PASSWORD_RESET_HTML.substitute(_escaped(user_name=user_name, reset_url=reset_url))
+        
+        text_body = _PASSWORD_RESET_TEXT.substitute(user_name=user_name, reset_url=reset_url)
+        
+        if background:
+            return self.send_email_async(to_email, subject, html_body, text_body)
+        return self.send_email(to_email, subject, html_body, text_body)
+
 
+@lru_cache(maxsize=1)
 def get_email_service() -> EmailService:
     """Get the email service singleton."""
-    global _email_service
-    if _email_service is None:
-        _email_service = EmailService()
-    return _email_service
+    return EmailService()
 
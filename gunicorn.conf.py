@@ -11,18 +11,33 @@ timeout = 180
 # Graceful timeout for worker shutdown
 graceful_timeout = 180
 
-# Number of workers
-workers = 2
+# Number of workers (WEB_CONCURRENCY overrides)
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
 
-# Worker class
+# Worker class - keep sync: app.py holds the active business and solver in
+# process globals that each request sets and then reads, so threaded workers
+# would let concurrent requests switch each other's business mid-request.
+# Emails don't hold a worker anyway; they go through the email queue thread.
 worker_class = "sync"
 
+# Heartbeat files in memory rather than on the container's overlay filesystem,
+# where a slow write can stall a worker long enough to be killed
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
 # Logging
 accesslog = "-"
 errorlog = "-"
 loglevel = "info"
 
 
+def post_worker_init(worker):
+    """Start the email worker (and its Resend connection) before requests arrive."""
+    from email_service import get_email_service
+    get_email_service().prewarm()
 
 
-
+def worker_exit(server, worker):
+    """Send any queued emails (invitations carry temp passwords) before the worker goes."""
+    from email_service import get_email_service
+    get_email_service().flush()
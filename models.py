@@ -1,21 +1,81 @@
 """Database models for user authentication, business settings, and scheduling data."""
 
 from datetime import datetime, date
+from functools import lru_cache
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from flask_bcrypt import Bcrypt
+from sqlalchemy import event, func
+import hashlib
 import json
+import secrets
 import uuid
 
 db = SQLAlchemy()
 bcrypt = Bcrypt()
 
+# Throwaway hash checked when a login matches no user (created on first use,
+# so it is hashed with the configured BCRYPT_LOG_ROUNDS)
+_dummy_password_hash = None
+
 
 def generate_uuid():
     """Generate a unique string ID."""
     return str(uuid.uuid4())[:8]
 
 
+@lru_cache(maxsize=256)
+def get_week_id(week_start):
+    """Schedule key for the week containing a date: ISO week-year and week, e.g. '2025-W01'."""
+    iso = week_start.isocalendar()
+    return f"{iso.year}-W{iso.week:02d}"
+
+
+def check_dummy_password(password):
+    """Spend the same bcrypt work as a real password check, then fail.
+    
+    Keeps unknown-user logins as slow as wrong-password logins so response
+    timing doesn't reveal which emails/usernames exist.
+    """
+    global _dummy_password_hash
+    if _dummy_password_hash is None:
+        _dummy_password_hash = bcrypt.generate_password_hash(secrets.token_urlsafe(16)).decode('utf-8')
+    bcrypt.check_password_hash(_dummy_password_hash, password)
+    return False
+
+
+def pack_slots(slots):
+    """Pack (day, hour) time slots as a flat [day0, hour0, day1, hour1, ...] list.
+    
+    Slots are sorted so the same set always serializes to the same JSON.
+    """
+    return [v for day, hour in sorted((slot.day, slot.hour) for slot in slots) for v in (day, hour)]
+
+
+def unpack_slots(raw):
+    """Yield (day, hour) pairs from a packed list or a legacy list of {'day', 'hour'} dicts."""
+    if raw and isinstance(raw[0], dict):
+        for s in raw:
+            yield s['day'], s['hour']
+    else:
+        yield from zip(raw[0::2], raw[1::2])
+
+
+def _parse_settings(record):
+    """Parse a settings record's settings_json, once per stored value.
+    
+    The parsed dict is kept on the instance next to the string it came from,
+    so repeated reads skip json.loads until set_settings or a reload replaces
+    settings_json.
+    """
+    cached = record.__dict__.get('_parsed_settings')
+    if cached is None or cached[0] is not record.settings_json:
+        settings = json.loads(record.settings_json) if record.settings_json else {}
+        cached = (record.settings_json, settings)
+        record._parsed_settings = cached
+    return cached[1]
+
+
 class User(db.Model, UserMixin):
     """User model for authentication (managers and employees)."""
     __tablename__ = 'users'
@@ -85,6 +145,11 @@ class User(db.Model, UserMixin):
         }
 
 
+# Case-insensitive login lookups (email or username) use these instead of a table scan
+db.Index('ix_users_email_lower', func.lower(User.email))
+db.Index('ix_users_username_lower', func.lower(User.username))
+
+
 class BusinessSettings(db.Model):
     """
     Global settings for user-created businesses.
@@ -94,7 +159,7 @@ class BusinessSettings(db.Model):
     
     id = db.Column(db.Integer, primary_key=True)
     business_id = db.Column(db.String(100), unique=True, nullable=False, index=True)
-    owner_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    owner_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     
     # Store settings as JSON
     settings_json = db.Column(db.Text, nullable=True)
@@ -110,14 +175,19 @@ class BusinessSettings(db.Model):
         return f'<BusinessSettings {self.business_id}>'
     
     def get_settings(self):
-        """Get settings as a dictionary."""
-        if self.settings_json:
-            return json.loads(self.settings_json)
-        return {}
+        """Get settings as a dictionary (shared per stored value; don't mutate it)."""
+        return _parse_settings(self)
     
     def set_settings(self, settings_dict):
-        """Set settings from a dictionary."""
-        self.settings_json = json.dumps(settings_dict)
+        """Set settings from a dictionary (compact JSON, no whitespace).
+        
+        Returns False without touching the row if the settings are unchanged.
+        """
+        settings_json = json.dumps(settings_dict, separators=(',', ':'), sort_keys=True)
+        if settings_json == self.settings_json:
+            return False
+        self.settings_json = settings_json
+        return True
     
     def to_dict(self):
         return {
@@ -156,14 +226,19 @@ class UserBusinessSettings(db.Model):
         return f'<UserBusinessSettings user={self.user_id} business={self.business_id}>'
     
     def get_settings(self):
-        """Get settings as a dictionary."""
-        if self.settings_json:
-            return json.loads(self.settings_json)
-        return {}
+        """Get settings as a dictionary (shared per stored value; don't mutate it)."""
+        return _parse_settings(self)
     
     def set_settings(self, settings_dict):
-        """Set settings from a dictionary."""
-        self.settings_json = json.dumps(settings_dict)
+        """Set settings from a dictionary (compact JSON, no whitespace).
+        
+        Returns False without touching the row if the settings are unchanged.
+        """
+        settings_json = json.dumps(settings_dict, separators=(',', ':'), sort_keys=True)
+        if settings_json == self.settings_json:
+            return False
+        self.settings_json = settings_json
+        return True
     
     def to_dict(self):
         return {
@@ -187,7 +262,7 @@ class DBBusiness(db.Model):
     
     id = db.Column(db.Integer, primary_key=True)
     business_id = db.Column(db.String(100), unique=True, nullable=False, index=True)
-    owner_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    owner_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     
     # Business info
     name = db.Column(db.String(200), nullable=False)
@@ -259,7 +334,11 @@ class DBRole(db.Model):
     color = db.Column(db.String(20), default='#4CAF50')
     
     # Unique constraint: one role ID per business
-    __table_args__ = (db.UniqueConstraint('role_id', 'business_db_id', name='unique_role_per_business'),)
+    # The unique constraint leads with role_id; this index serves the per-business relationship load
+    __table_args__ = (
+        db.UniqueConstraint('role_id', 'business_db_id', name='unique_role_per_business'),
+        db.Index('ix_role_biz_roleid', 'business_db_id', 'role_id'),
+    )
     
     def __repr__(self):
         return f'<DBRole {self.role_id}: {self.name}>'
@@ -316,7 +395,10 @@ class DBEmployee(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Unique constraint: one employee ID per business
-    __table_args__ = (db.UniqueConstraint('employee_id', 'business_db_id', name='unique_employee_per_business'),)
+    __table_args__ = (
+        db.UniqueConstraint('employee_id', 'business_db_id', name='unique_employee_per_business'),
+        db.Index('ix_employee_biz_empid', 'business_db_id', 'employee_id'),
+    )
     
     def __repr__(self):
         return f'<DBEmployee {self.employee_id}: {self.name}>'
@@ -342,7 +424,7 @@ class DBEmployee(db.Model):
     
     def set_availability_data(self, data):
         """Set availability from a dictionary."""
-        self.availability_json = json.dumps(data)
+        self.availability_json = json.dumps(data, separators=(',', ':'))
     
     def to_dict(self):
         avail_data = self.get_availability_data()
@@ -362,9 +444,9 @@ class DBEmployee(db.Model):
             'overtime_allowed': self.overtime_allowed,
             'hourly_rate': self.hourly_rate,
             'weekend_shifts_worked': self.weekend_shifts_worked,
-            'availability': avail_data.get('availability', []),
-            'preferences': avail_data.get('preferences', []),
-            'time_off': avail_data.get('time_off', [])
+            'availability': [{'day': d, 'hour': h} for d, h in unpack_slots(avail_data.get('availability', []))],
+            'preferences': [{'day': d, 'hour': h} for d, h in unpack_slots(avail_data.get('preferences', []))],
+            'time_off': [{'day': d, 'hour': h} for d, h in unpack_slots(avail_data.get('time_off', []))]
         }
 
 
@@ -389,7 +471,10 @@ class DBShiftTemplate(db.Model):
     roles_json = db.Column(db.Text, default='[]')
     
     # Unique constraint
-    __table_args__ = (db.UniqueConstraint('shift_id', 'business_db_id', name='unique_shift_per_business'),)
+    __table_args__ = (
+        db.UniqueConstraint('shift_id', 'business_db_id', name='unique_shift_per_business'),
+        db.Index('ix_shift_biz_shiftid', 'business_db_id', 'shift_id'),
+    )
     
     def __repr__(self):
         return f'<DBShiftTemplate {self.shift_id}: {self.name}>'
@@ -415,7 +500,7 @@ class DBShiftTemplate(db.Model):
     
     def set_roles_requirements(self, roles):
         """Set role requirements from a list."""
-        self.roles_json = json.dumps(roles)
+        self.roles_json = json.dumps(roles, separators=(',', ':'))
     
     def to_dict(self):
         return {
@@ -474,7 +559,7 @@ class DBSchedule(db.Model):
     
     def set_schedule_data(self, data):
         """Set schedule from a dictionary."""
-        self.schedule_json = json.dumps(data)
+        self.schedule_json = json.dumps(data, separators=(',', ':'))
     
     def to_dict(self):
         return {
@@ -510,6 +595,8 @@ class DBShiftAssignment(db.Model):
     # Relationship
     schedule = db.relationship('DBSchedule', backref=db.backref('assignments', lazy=True, cascade='all, delete-orphan'))
     
+    __table_args__ = (db.Index('ix_assign_sched_emp', 'schedule_id', 'employee_id'),)
+    
     def __repr__(self):
         return f'<DBShiftAssignment {self.employee_name} day={self.day} {self.start_hour}-{self.end_hour}>'
     
@@ -643,19 +730,27 @@ class PasswordResetToken(db.Model):
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    token = db.Column(db.String(100), unique=True, nullable=False, index=True)
+    token = db.Column(db.String(100), unique=True, nullable=False, index=True)  # hash_token() digest, never the raw token
     
     # Expiration
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     expires_at = db.Column(db.DateTime, nullable=False)
     used_at = db.Column(db.DateTime, nullable=True)
     
+    # Backs the "unused tokens for this user" lookup in forgot_password
+    __table_args__ = (db.Index('ix_reset_tokens_user_used', 'user_id', 'used_at'),)
+    
     # Relationship
     user = db.relationship('User', backref=db.backref('reset_tokens', lazy=True))
     
     def __repr__(self):
         return f'<PasswordResetToken for user {self.user_id}>'
     
+    @staticmethod
+    def hash_token(token):
+        """Digest a raw reset token for storage/lookup (the raw token only goes in the email)."""
+        return hashlib.blake2b(token.encode('utf-8'), digest_size=16).hexdigest()
+    
     def is_valid(self):
         """Check if token is still valid (not expired, not used)."""
         from datetime import datetime
@@ -715,12 +810,24 @@ class PTORequest(db.Model):
         }
 
 
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Use WAL journaling on the dev SQLite DB (readers don't block the writer, far fewer fsyncs)."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute('PRAGMA temp_store=MEMORY')
+    cursor.close()
+
+
 def init_db(app):
     """Initialize the database with the Flask app."""
     db.init_app(app)
     bcrypt.init_app(app)
     
     with app.app_context():
+        if db.engine.dialect.name == 'sqlite':
+            event.listen(db.engine, 'connect', _set_sqlite_pragmas)
+        
         db.create_all()
         
         # Run migrations to add any missing columns
@@ -776,6 +883,12 @@ def _run_migrations(app):
         # Migration: Add ON DELETE CASCADE to all foreign keys referencing businesses.id
         # This allows deleting a business directly via SQL and having all child rows cleaned up
         _migrate_cascade_foreign_keys(app)
+        
+        # Migration: Create indexes declared on models after their tables already existed
+        _migrate_missing_indexes(app)
+        
+        # Migration: Re-key schedules saved with the old strftime('%Y-W%V') week IDs
+        _migrate_schedule_week_ids(app)
     
     except Exception as e:
         print(f"[DB MIGRATION] Warning during migration check: {e}", flush=True)
@@ -843,4 +956,103 @@ def _migrate_cascade_foreign_keys(app):
             print(f"[DB MIGRATION] Warning updating FK {constraint_name}: {e}", flush=True)
     
     if migrations_run:
-        print(f"[DB MIGRATION] Updated foreign key cascades: {migrations_run}", flush=True)
\ No newline at end of file
+        print(f"[DB MIGRATION] Updated foreign key cascades: {migrations_run}", flush=True)
+
+
+def _existing_index_names(conn):
+    """Names of usable indexes in the database, and (Postgres) invalid leftovers.
+    
+    Expression indexes (e.g. lower(email)) aren't reflected on every backend,
+    so read the catalog by name instead of going through the inspector.
+    """
+    from sqlalchemy import text, inspect
+    
+    if conn.dialect.name == 'postgresql':
+        rows = conn.execute(text(
+            "SELECT c.relname, i.indisvalid FROM pg_index i "
+            "JOIN pg_class c ON c.oid = i.indexrelid "
+            "JOIN pg_namespace n ON n.oid = c.relnamespace "
+            "WHERE n.nspname = current_schema()"
+        )).all()
+        return {name for name, valid in rows if valid}, {name for name, valid in rows if not valid}
+    if conn.dialect.name == 'sqlite':
+        rows = conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'")).all()
+        return {name for (name,) in rows}, set()
+    return {ix['name'] for table in db.metadata.tables for ix in inspect(conn).get_indexes(table)}, set()
+
+
+def _migrate_missing_indexes(app):
+    """Create any model-declared indexes that are missing from existing tables.
+    
+    db.create_all() only creates indexes along with brand new tables, so indexes
+    added to a model later never reach a database that already has the table.
+    Only indexes missing by name are built, so a normal boot issues no DDL. On
+    Postgres they are built CONCURRENTLY (outside a transaction, without the
+    statement timeout) so writes to a populated table aren't blocked; an invalid
+    index left by an interrupted concurrent build is dropped and rebuilt.
+    """
+    from sqlalchemy import text
+    from sqlalchemy.schema import CreateIndex
+    
+    with db.engine.connect() as conn:
+        existing, invalid = _existing_index_names(conn)
+    missing = [
+        index for table in db.metadata.tables.values() for index in table.indexes
+        if index.name not in existing
+    ]
+    if not missing:
+        return
+    
+    postgres = db.engine.dialect.name == 'postgresql'
+    with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        if postgres:
+            conn.execute(text("SET statement_timeout = 0"))
+        for index in missing:
+            sql = str(CreateIndex(index, if_not_exists=True).compile(dialect=conn.dialect))
+            try:
+                if postgres:
+                    if index.name in invalid:
+                        conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{index.name}"'))
+                    sql = sql.replace('INDEX IF NOT EXISTS', 'INDEX CONCURRENTLY IF NOT EXISTS', 1)
+                conn.execute(text(sql))
+                print(f"[DB MIGRATION] Created index {index.name}", flush=True)
+            except Exception as e:
+                print(f"[DB MIGRATION] Warning creating index {index.name}: {e}", flush=True)
+
+
+def _migrate_schedule_week_ids(app):
+    """Re-key schedules whose week_id doesn't match get_week_id(week_start_date).
+    
+    Week IDs used to be built with strftime('%Y-W%V'), which pairs the calendar
+    year with the ISO week number, so weeks starting around New Year were keyed
+    under the wrong year (e.g. Mon 2024-12-30 became '2024-W01'). The years
+    only disagree for dates from Dec 29 to Jan 3, so just those rows are read
+    (a handful, and none once fixed, so later boots update nothing). Rows are
+    updated newest first, so a key freed by a later week is available to the
+    earlier week that needs it.
+    """
+    month = func.extract('month', DBSchedule.week_start_date)
+    day = func.extract('day', DBSchedule.week_start_date)
+    rows = db.session.query(DBSchedule.id, DBSchedule.week_id, DBSchedule.week_start_date).filter(
+        ((month == 12) & (day >= 29)) | ((month == 1) & (day <= 3))
+    ).order_by(
+        DBSchedule.week_start_date.desc()
+    ).all()
+    
+    rekeyed = []
+    for schedule_id, week_id, week_start_date in rows:
+        if week_start_date is None:
+            continue
+        correct_week_id = get_week_id(week_start_date)
+        if week_id == correct_week_id:
+            continue
+        try:
+            DBSchedule.query.filter_by(id=schedule_id).update({'week_id': correct_week_id})
+            db.session.commit()
+            rekeyed.append(f'{week_id} -> {correct_week_id}')
+        except Exception as e:
+            db.session.rollback()
+            print(f"[DB MIGRATION] Warning re-keying schedule {schedule_id} ({week_id}): {e}", flush=True)
+    
+    if rekeyed:
+        print(f"[DB MIGRATION] Re-keyed schedule week IDs: {rekeyed}", flush=True)
@@ -842,11 +842,12 @@ def _try_import_db_service():
     """Try to import db_service module. Returns None if not in app context."""
     try:
         from db_service import (
-            get_db_business, get_user_db_business, save_business_to_db,
+            get_db_business, get_db_business_full, get_user_db_business, save_business_to_db,
             load_business_from_db, get_all_persisted_businesses, is_business_persisted
         )
         return {
             'get_db_business': get_db_business,
+            'get_db_business_full': get_db_business_full,
             'get_user_db_business': get_user_db_business,
             'save_business_to_db': save_business_to_db,
             'load_business_from_db': load_business_from_db,
@@ -876,7 +877,7 @@ def load_businesses_from_db(force_reload=False):
         return
     
     try:
-        db_businesses = db_funcs['get_all_persisted_businesses']()
+        db_businesses = db_funcs['get_all_persisted_businesses'](full=True)
         for db_business in db_businesses:
             scenario = db_funcs['load_business_from_db'](db_business)
             _business_cache[scenario.id] = scenario
@@ -1041,7 +1042,7 @@ def get_business_by_id(business_id: str, force_reload: bool = False) -> Business
     db_funcs = _try_import_db_service()
     if db_funcs:
         try:
-            db_business = db_funcs['get_db_business'](business_id)
+            db_business = db_funcs['get_db_business_full'](business_id)
             if db_business:
                 scenario = db_funcs['load_business_from_db'](db_business)
                 _business_cache[scenario.id] = scenario
@@ -1,7 +1,7 @@
 """Data models for the advanced staff scheduler."""
 
 from dataclasses import dataclass, field
-from typing import Dict, List, Set, Tuple, Optional
+from typing import Dict, List, NamedTuple, Set, Tuple, Optional
 from enum import Enum
 
 
@@ -17,20 +17,15 @@ class CoverageMode(Enum):
     DETAILED = "detailed"  # Detailed: hour-by-hour grid
 
 
-@dataclass
-class TimeSlot:
-    """Represents a single hour slot that can be worked."""
+class TimeSlot(NamedTuple):
+    """Represents a single hour slot that can be worked.
+    
+    A NamedTuple rather than a dataclass: employees carry sets of hundreds of
+    these, and tuple construction/hashing is done in C.
+    """
     day: int  # 0=Monday, 6=Sunday
     hour: int  # Operating hour (e.g., 8 for 8AM)
     
-    def __hash__(self):
-        return hash((self.day, self.hour))
-    
-    def __eq__(self, other):
-        if not isinstance(other, TimeSlot):
-            return False
-        return self.day == other.day and self.hour == other.hour
-    
     def to_dict(self) -> dict:
         return {"day": self.day, "hour": self.hour}
 
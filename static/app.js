@@ -6228,7 +6228,7 @@ async function handleEmployeeSubmit(e) {
             // Show appropriate toast based on whether invitation was sent
             if (data.invitation_sent) {
                 const methods = data.invitation_methods.join(' & ');
-                showToast(`${isNew ? 'Employee added' : 'Employee updated'} — invitation sent via ${methods}`, 'success');
+                showToast(`${isNew ? 'Employee added' : 'Employee updated'} — invitation queued via ${methods}`, 'success');
             } else if (data.invitation_errors && data.invitation_errors.length > 0) {
                 // Employee was created but invitation had issues — show clear message
                 showToast(isNew ? 'Employee added successfully' : 'Employee updated successfully', 'success');